@@ -0,0 +1,101 @@
+# Event loop latency while the bot logs heavily: file handler on the loop vs the queue listener in utils/loggingsetup.py.
+# Run from the repository root:  python -m benchmarks.bench_logging
+import asyncio
+import logging
+import logging.handlers
+import os
+import queue
+import statistics
+import tempfile
+import time
+from utils.loggingsetup import HotPathFilter, build_listener
+
+RECORDS = 50_000
+BATCH = 50  # records logged between two yields to the loop, like a burst of fetch_view calls
+ROW = (123456789012345678, 234567890123456789, 'rank', 345678901234567890, 'f' * 40)
+# Renaming five backups is fast on a local disk and not on a container volume or network share
+ROTATION_STALL = 0.05
+
+
+def slow_rotate(source: str, dest: str) -> None:
+    time.sleep(ROTATION_STALL)
+    os.rename(source, dest)
+
+
+async def measure_lag(stop: asyncio.Event, lags: list) -> None:
+    # How late a 1 ms sleep wakes up is how long other work held the loop
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(0.001)
+        lags.append(loop.time() - start - 0.001)
+
+
+async def produce(log: logging.Logger, lazy: bool) -> None:
+    for i in range(RECORDS // BATCH):
+        for j in range(BATCH):
+            if lazy:
+                # What persistent_db.fetch_view does now: DEBUG with lazy arguments
+                log.debug("Found view in DB: %s (%s/%s)", ROW, i, j)
+            else:
+                log.info(f"Found view in DB: {ROW} ({i}/{j})")
+        await asyncio.sleep(0)
+
+
+async def bench(name: str, log: logging.Logger, lazy: bool = False) -> None:
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+    start = time.perf_counter()
+    await produce(log, lazy)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    print(f"{name:<22} {elapsed:>8.3f} {statistics.median(lags) * 1000:>8.2f} {p99 * 1000:>8.2f} {lags[-1] * 1000:>8.2f}")
+
+
+def fresh_logger(name: str) -> logging.Logger:
+    log = logging.getLogger(f'bench.{name}')
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    return log
+
+
+async def main() -> None:
+    print(f"{'handler':<22} {'seconds':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}   ({RECORDS} records, 1 MiB rotation, {ROTATION_STALL * 1000:.0f} ms per backup rename)")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before: formatting, write and rotation all on the loop thread
+        log = fresh_logger('direct')
+        direct = logging.handlers.RotatingFileHandler(os.path.join(tmp, 'direct.log'), maxBytes=1024 * 1024, backupCount=5, encoding='utf-8')
+        direct.rotator = slow_rotate
+        direct.setFormatter(logging.Formatter('[{asctime}] [{levelname:<8}] {name}: {message}', style='{'))
+        log.addHandler(direct)
+        await bench('direct file', log)
+        direct.close()
+
+        scenarios = (
+            ('queue + json', {}, False),
+            ('queue + json + limit', {'bench_logging': 100}, False),
+            ('queue + lazy debug', {}, True),
+        )
+        for name, limits, lazy in scenarios:
+            log = fresh_logger(name)
+            log_queue = queue.SimpleQueue()
+            handler = logging.handlers.QueueHandler(log_queue)
+            handler.addFilter(HotPathFilter(limits))
+            log.addHandler(handler)
+            listener = build_listener(log_queue, os.path.join(tmp, f'{name}.log'), json_lines=True)
+            # Same rotation size and stall as the direct handler, paid on the listener thread
+            listener.handlers[0].rotator = slow_rotate
+            listener.handlers[0].maxBytes = 1024 * 1024
+            listener.start()
+            await bench(name, log, lazy)
+            # The listener drains what is left off the loop; not part of the loop timing
+            listener.stop()
+            listener.handlers[0].close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+# Benchmarks PostgresViewStore against a local Postgres, compared with SQLiteViewStore on the same workload.
+# Uses the same POSTGRE_* variables as run_bot.py (a .env file is read if present) and works in a
+# throwaway schema, so the real views table is never touched.
+# Run from the repository root:  python -m benchmarks.bench_postgres_store [rows]
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import asyncpg
+from dotenv import load_dotenv
+from db.postgre_connection import get_db_credentials
+from db.postgre_store import PostgresViewStore
+from db.sqlite_store import SQLiteViewStore
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+VIEW_TYPES = ('na', 'jp', 'rank', 'ping')
+
+
+def workload() -> list:
+    return [(i // len(VIEW_TYPES), 1, i, VIEW_TYPES[i % len(VIEW_TYPES)], None) for i in range(ROWS)]
+
+
+async def run(store) -> dict:
+    rows = workload()
+    timings = {}
+    await store.setup()
+
+    start = time.perf_counter()
+    for row in rows:
+        await store.apply_view_changes([row], [])
+    timings['upsert one per transaction'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await store.apply_view_changes(rows, [])
+    timings['upsert batch (executemany)'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for guild_id, _, _, view_type, _ in rows:
+        await store.fetch_view(view_type, guild_id)
+    timings['fetch_view per row'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await store.fetch_all_views()
+    timings['fetch_all_views'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await store.apply_view_changes([], [(guild_id, view_type) for guild_id, _, _, view_type, _ in rows])
+    timings['delete batch (executemany)'] = time.perf_counter() - start
+    return timings
+
+
+async def main() -> None:
+    load_dotenv()
+    creds = get_db_credentials()
+    if not all(creds.values()):
+        print('Set POSTGRE_USER, POSTGRE_PASSWORD, POSTGRE_HOSTNAME, POSTGRE_PORT and POSTGRE_DATABASE_NAME first.')
+        sys.exit(1)
+
+    dsn = f"postgres://{creds['DB_USER']}:{creds['DB_PASS']}@{creds['DB_HOST']}:{creds['DB_PORT']}/{creds['DB_NAME']}"
+    schema = f'bench_views_{os.getpid()}'
+    admin = await asyncpg.connect(dsn)
+    await admin.execute(f'CREATE SCHEMA {schema}')
+    try:
+        async with asyncpg.create_pool(dsn=dsn, server_settings={'search_path': schema}) as pool:
+            postgres = await run(PostgresViewStore(pool))
+    finally:
+        await admin.execute(f'DROP SCHEMA {schema} CASCADE')
+        await admin.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_store = SQLiteViewStore(os.path.join(tmp, 'views.db'))
+        await sqlite_store.open()
+        try:
+            sqlite = await run(sqlite_store)
+        finally:
+            await sqlite_store.close()
+
+    print(f"{ROWS} rows")
+    print(f"{'operation':<30} {'postgres ms':>12} {'sqlite ms':>10}")
+    for op in postgres:
+        print(f"{op:<30} {postgres[op] * 1000:>12.1f} {sqlite[op] * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
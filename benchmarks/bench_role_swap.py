@@ -0,0 +1,140 @@
+# REST calls and latency per role menu click: remove_roles + add_roles against one member edit from utils.rolediff,
+# and a burst of clicks from one member with and without the per-member serializer.
+# REST calls are simulated with a fixed round-trip time, so the numbers show request counts, not Discord's speed.
+# Run from the repository root:  python -m benchmarks.bench_role_swap [round_trip_ms]
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+from utils.rolediff import apply_role_edit, member_role_ids, plan_swap, plan_toggle
+from utils.roleserializer import MemberRoleSerializer
+
+ROUND_TRIP = (float(sys.argv[1]) if len(sys.argv) > 1 else 50.0) / 1000
+CLICKS = 50
+GUILD_ID = 1
+
+
+class FakeMember:
+    """Just enough of discord.Member for both code paths; every REST method costs one round trip."""
+
+    def __init__(self, roles: list) -> None:
+        self.id = 42
+        self.guild = SimpleNamespace(id=GUILD_ID)
+        self.roles = [SimpleNamespace(id=GUILD_ID, name='@everyone')] + roles
+        self.rest_calls = 0
+
+    async def _request(self) -> None:
+        self.rest_calls += 1
+        await asyncio.sleep(ROUND_TRIP)
+
+    async def remove_roles(self, *roles) -> None:
+        await self._request()
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def add_roles(self, *roles) -> None:
+        await self._request()
+        self.roles = self.roles + list(roles)
+
+    async def edit(self, roles, reason=None) -> None:
+        await self._request()
+        self.roles = self.roles[:1] + [ROLES_BY_ID[obj.id] for obj in roles]
+
+
+CATEGORY = [SimpleNamespace(id=100 + i, name=f'NA {2000 + i * 100} XP') for i in range(10)]
+OTHER = [SimpleNamespace(id=1000 + i, name=f'role {i}') for i in range(40)]
+ROLES_BY_ID = {role.id: role for role in CATEGORY + OTHER}
+
+
+async def swap_two_calls(member: FakeMember, selected) -> None:
+    # The previous RoleSelectPowers/RoleSelectRanks callback body
+    roles_to_remove = [role for role in CATEGORY if role in member.roles]
+    if roles_to_remove:
+        await member.remove_roles(*roles_to_remove)
+    if selected not in roles_to_remove:
+        await member.add_roles(selected)
+
+
+async def swap_one_edit(member: FakeMember, selected) -> None:
+    edit = plan_swap(member_role_ids(member), (role.id for role in CATEGORY), selected.id)
+    await apply_role_edit(member, edit)
+
+
+async def toggle_two_calls(member: FakeMember, selected: list) -> None:
+    # The previous RoleSelectPings callback body
+    roles_to_remove = [role for role in selected if role in member.roles]
+    roles_to_add = [role for role in selected if role not in member.roles]
+    if roles_to_remove:
+        await member.remove_roles(*roles_to_remove)
+    if roles_to_add:
+        await member.add_roles(*roles_to_add)
+
+
+async def toggle_one_edit(member: FakeMember, selected: list) -> None:
+    await apply_role_edit(member, plan_toggle(member_role_ids(member), (role.id for role in selected)))
+
+
+async def bench(name: str, click, pick) -> None:
+    member = FakeMember(OTHER + CATEGORY[:1])
+    start = time.perf_counter()
+    for i in range(CLICKS):
+        await click(member, pick(i))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<22} {member.rest_calls / CLICKS:>10.2f} {elapsed / CLICKS * 1000:>10.1f}")
+
+
+async def bench_storm(name: str, serialized: bool, burst: int = 10) -> None:
+    # One member clicking through a menu faster than the edits complete
+    member = FakeMember(OTHER + CATEGORY[:1])
+    serializer = MemberRoleSerializer()
+    category_ids = [role.id for role in CATEGORY]
+
+    async def click(selected):
+        if serialized:
+            await serializer.submit(member, lambda current: plan_swap(current, category_ids, selected.id))
+        else:
+            await swap_one_edit(member, selected)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(click(CATEGORY[i % len(CATEGORY)]) for i in range(burst)))
+    elapsed = time.perf_counter() - start
+    final = [role.name for role in member.roles if role in CATEGORY]
+    print(f"{name:<22} {member.rest_calls:>10} {elapsed * 1000:>10.1f}  final {final}")
+
+
+def bench_planning(roles: int, repeat: int = 2000) -> None:
+    # CPU cost of deciding what to change, without any simulated network time
+    category = [SimpleNamespace(id=i, name=f'r{i}') for i in range(roles)]
+    member = SimpleNamespace(guild=SimpleNamespace(id=-1), roles=category[::2])
+    selected = category[-1]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        [role for role in category if role in member.roles]
+        selected in member.roles
+    scans = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        plan_swap(member_role_ids(member), (role.id for role in category), selected.id)
+    sets = time.perf_counter() - start
+    print(f"{roles:>6} roles  list scans {scans / repeat * 1e6:>9.1f} us  id sets {sets / repeat * 1e6:>7.1f} us")
+
+
+async def main() -> None:
+    print(f"simulated round trip {ROUND_TRIP * 1000:.0f} ms, {CLICKS} clicks each")
+    print(f"{'path':<22} {'calls/click':>10} {'ms/click':>10}")
+    await bench('swap remove+add', swap_two_calls, lambda i: CATEGORY[i % len(CATEGORY)])
+    await bench('swap one edit', swap_one_edit, lambda i: CATEGORY[i % len(CATEGORY)])
+    await bench('toggle remove+add', toggle_two_calls, lambda i: CATEGORY[i % 3:i % 3 + 4])
+    await bench('toggle one edit', toggle_one_edit, lambda i: CATEGORY[i % 3:i % 3 + 4])
+    print()
+    print(f"{'burst of 10 clicks':<22} {'calls':>10} {'ms':>10}")
+    await bench_storm('concurrent edits', serialized=False)
+    await bench_storm('serialized', serialized=True)
+    print()
+    for roles in (25, 250, 1000):
+        bench_planning(roles)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+# Compares the old connect-per-call path of db/persistent_db.py with the shared connection manager.
+# Run from the repository root:  python -m benchmarks.bench_sqlite_connection [iterations]
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import aiosqlite
+import db.persistent_db as pdb
+from db.sqlite_store import SQLiteViewStore
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+SELECT_VIEW = """
+    SELECT id, guild_id, channel_id, message_id
+    FROM views
+    WHERE guild_id = ? AND view_type = ?
+"""
+UPSERT_VIEW = """
+    INSERT INTO views (guild_id, channel_id, message_id, view_type)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(guild_id, view_type) DO UPDATE SET
+        channel_id = excluded.channel_id,
+        message_id = excluded.message_id
+"""
+
+
+# The pre-manager implementation: every call opens (and tears down) its own connection
+async def legacy_fetch_view(path: str, view_type: pdb.ViewType, guild_id: int):
+    async with aiosqlite.connect(path) as db:
+        async with db.execute(SELECT_VIEW, (guild_id, view_type.value)) as cursor:
+            return await cursor.fetchone()
+
+async def legacy_insert_view(path: str, view_type: pdb.ViewType, guild_id: int, channel_id: int, message_id: int):
+    await legacy_fetch_view(path, view_type, guild_id)
+    async with aiosqlite.connect(path) as db:
+        await db.execute(UPSERT_VIEW, (guild_id, channel_id, message_id, view_type.value))
+        await db.commit()
+
+
+async def run_legacy(path: str) -> dict:
+    # setup_db leaves the file in WAL mode; the old code ran with sqlite's default rollback journal
+    async with aiosqlite.connect(path) as db:
+        await db.execute("PRAGMA journal_mode=DELETE")
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        await legacy_fetch_view(path, pdb.ViewType.NA, i % 100)
+    fetch_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        await legacy_insert_view(path, pdb.ViewType.NA, i % 100, 1, i)
+    insert_elapsed = time.perf_counter() - start
+    return {'fetch_view': fetch_elapsed, 'insert_view': insert_elapsed}
+
+async def run_managed(path: str) -> dict:
+    pdb.use_store(SQLiteViewStore(path))
+    await pdb.open_db()
+    try:
+        start = time.perf_counter()
+        for i in range(ITERATIONS):
+            await pdb.fetch_view(pdb.ViewType.NA, i % 100)
+        fetch_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(ITERATIONS):
+            # The old-message cleanup is skipped because the fake bot knows no guilds
+            await pdb.insert_view(pdb.ViewType.NA, i % 100, 1, i, bot=_NoGuildBot())
+        insert_elapsed = time.perf_counter() - start
+    finally:
+        await pdb.close_db()
+    return {'fetch_view': fetch_elapsed, 'insert_view': insert_elapsed}
+
+
+class _NoGuildBot:
+    def get_guild(self, guild_id):
+        return None
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, runner in (('connect-per-call', run_legacy), ('shared connection', run_managed)):
+            path = os.path.join(tmp, f"{name.replace(' ', '_')}.db")
+            pdb.use_store(SQLiteViewStore(path))
+            await pdb.setup_db()
+            await pdb.close_db()
+            results[name] = await runner(path)
+
+    print(f"{ITERATIONS} iterations per operation")
+    print(f"{'path':<20} {'op':<12} {'total s':>9} {'per call us':>12}")
+    for name, timings in results.items():
+        for op, elapsed in timings.items():
+            print(f"{name:<20} {op:<12} {elapsed:>9.3f} {elapsed / ITERATIONS * 1e6:>12.1f}")
+    for op in ('fetch_view', 'insert_view'):
+        speedup = results['connect-per-call'][op] / results['shared connection'][op]
+        print(f"{op} speedup: {speedup:.1f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+# Compares per-row delete_view commits with the write-behind queue when restore_views drops stale rows.
+# Run from the repository root:  python -m benchmarks.bench_write_behind
+import asyncio
+import os
+import tempfile
+import time
+import db.persistent_db as pdb
+from db.sqlite_store import SQLiteViewStore
+from db.view_registry import ViewRegistry
+from db.write_behind import ViewWriteQueue
+
+GUILD_COUNTS = (10, 100, 1000)
+VIEW_TYPES = [view_type.value for view_type in pdb.ViewType]
+
+
+async def seed(guilds: int) -> None:
+    rows = [
+        (guild_id, 1, guild_id * 10 + i, view_type, None)
+        for guild_id in range(guilds)
+        for i, view_type in enumerate(VIEW_TYPES)
+    ]
+    await pdb.apply_view_changes(rows, [])
+
+
+async def count_commits(run) -> int:
+    # Each commit on the shared connection is one WAL append (and fsync at checkpoint time)
+    conn = await pdb.store.manager.open()
+    original = conn.commit
+    commits = 0
+
+    async def counting_commit():
+        nonlocal commits
+        commits += 1
+        await original()
+
+    conn.commit = counting_commit
+    try:
+        await run()
+    finally:
+        conn.commit = original
+    return commits
+
+
+async def bench(guilds: int, batched: bool) -> tuple:
+    with tempfile.TemporaryDirectory() as tmp:
+        pdb.use_store(SQLiteViewStore(os.path.join(tmp, 'views.db')))
+        await pdb.setup_db()
+        await seed(guilds)
+        registry = ViewRegistry(ViewWriteQueue(max_pending=1000, flush_interval=60))
+        await registry.load()
+
+        async def drop_all_per_row():
+            for record in registry.all():
+                await pdb.delete_view(record.message_id, record.guild_id)
+
+        async def drop_all_batched():
+            for record in registry.all():
+                await registry.remove(record.message_id)
+            await registry.writer.close()
+
+        start = time.perf_counter()
+        commits = await count_commits(drop_all_batched if batched else drop_all_per_row)
+        elapsed = time.perf_counter() - start
+        remaining = len(await pdb.fetch_all_views())
+        await pdb.close_db()
+    return commits, elapsed, remaining
+
+
+async def main() -> None:
+    print(f"{'guilds':>7} {'rows':>6} {'path':<12} {'commits':>8} {'seconds':>9} {'left':>5}")
+    for guilds in GUILD_COUNTS:
+        for batched in (False, True):
+            commits, elapsed, remaining = await bench(guilds, batched)
+            name = 'write-behind' if batched else 'per-row'
+            print(f"{guilds:>7} {guilds * len(VIEW_TYPES):>6} {name:<12} {commits:>8} {elapsed:>9.3f} {remaining:>5}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,413 @@
+# A local stand-in for the parts of Discord the bot talks to, for load tests that cannot run against the real API.
+# REST: login, command sync, message send/fetch/edit/delete, member fetch/edit and role add/remove,
+# interaction callbacks and followups. Gateway: HELLO, IDENTIFY -> READY + GUILD_CREATE, heartbeats,
+# member chunk requests, and INTERACTION_CREATE pushed by a driver (see benchmarks/loadtest.py).
+# Every REST request can be delayed and answered with a 429 to see how the bot behaves under load.
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+import discord
+from aiohttp import web
+
+API = '/api/v10'
+HEARTBEAT_INTERVAL_MS = 41250
+# Discord forgets an interaction that has no response after this long
+INTERACTION_DEADLINE = 3.0
+
+
+def json_response(data, status: int = 200, headers: Optional[dict] = None) -> web.Response:
+    # discord.py only parses a body whose content type is exactly application/json, without a charset
+    return web.Response(body=json.dumps(data).encode(), status=status, headers={**(headers or {}), 'Content-Type': 'application/json'})
+
+
+class FakeInteractionState:
+    """What the bot did with one dispatched interaction, timed from the dispatch."""
+
+    def __init__(self, id: int, token: str) -> None:
+        self.id = id
+        self.token = token
+        self.dispatched = time.perf_counter()
+        self.ack: Optional[float] = None
+        self.deferred = False
+        self.replies: List[dict] = []
+        self.expired = False
+        self.done = asyncio.get_running_loop().create_future()
+
+
+class FakeDiscord:
+    """Serves fake REST routes and a gateway on one local port.
+
+    `latency` and `jitter` (seconds) delay every rate-limitable REST request.
+    `rate_limit_ratio` of those requests are answered with a 429 carrying
+    `retry_after`. `member_edits_per_second` adds Discord's per-guild member
+    edit limit as a token bucket (0 disables it). An interaction reply is done
+    when `is_final(reply)` says so; by default that is the first reply.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.01,
+        rate_limit_ratio: float = 0.0,
+        retry_after: float = 0.5,
+        member_edits_per_second: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.member_edits_per_second = member_edits_per_second
+        self.random = random.Random(seed)
+        self.is_final = lambda reply: True
+
+        self._ids = itertools.count(discord.utils.time_snowflake(discord.utils.utcnow()))
+        self.application_id = self.snowflake()
+        self.bot_user = self.user(self.application_id, 'LoadTestBot', bot=True)
+        self.guilds: Dict[int, dict] = {}
+        self.members: Dict[int, Dict[int, dict]] = {}
+        self.messages: Dict[int, dict] = {}
+        self.commands: Dict[str, list] = {}
+        self.interactions: Dict[str, FakeInteractionState] = {}
+        self._edit_tokens: Dict[int, List[float]] = {}
+
+        self.requests: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self.unknown: Counter = Counter()
+        self.ws: Optional[web.WebSocketResponse] = None
+        self.identified = asyncio.Event()
+        self._seq = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+    # State
+
+    def snowflake(self) -> int:
+        return next(self._ids)
+
+    @staticmethod
+    def user(id: int, name: str, bot: bool = False) -> dict:
+        return {'id': str(id), 'username': name, 'global_name': name, 'discriminator': '0', 'avatar': None, 'bot': bot}
+
+    def member_payload(self, guild_id: int, user_id: int) -> dict:
+        member = self.members[guild_id][user_id]
+        return {
+            'user': member['user'], 'roles': [str(role_id) for role_id in member['roles']], 'nick': None,
+            'joined_at': '2024-01-01T00:00:00+00:00', 'deaf': False, 'mute': False, 'flags': 0, 'pending': False,
+        }
+
+    def add_guild(self, roles: List[str], members: int) -> int:
+        """A guild with one text channel, the given role names, `members` members and the bot as administrator."""
+        guild_id = self.snowflake()
+        admin_role = self.snowflake()
+        role_payloads = [self.role(guild_id, '@everyone', 0, permissions='0')]
+        role_payloads.append(self.role(admin_role, 'Bot', len(roles) + 1, permissions='8'))
+        role_payloads += [self.role(self.snowflake(), name, position + 1) for position, name in enumerate(roles)]
+        channel_id = self.snowflake()
+        self.guilds[guild_id] = {
+            'id': str(guild_id), 'name': f'Load test {len(self.guilds)}', 'icon': None, 'owner_id': str(self.snowflake()),
+            'roles': role_payloads, 'emojis': [], 'stickers': [], 'features': [], 'member_count': members + 1,
+            'channels': [{'id': str(channel_id), 'type': 0, 'name': 'menus', 'position': 0, 'permission_overwrites': [], 'nsfw': False}],
+            'threads': [], 'voice_states': [], 'presences': [], 'stage_instances': [], 'guild_scheduled_events': [],
+            'large': False, 'unavailable': False, 'joined_at': '2024-01-01T00:00:00+00:00', 'premium_tier': 0,
+            'verification_level': 0, 'default_message_notifications': 0, 'explicit_content_filter': 0, 'mfa_level': 0,
+            'system_channel_flags': 0, 'preferred_locale': 'en-US', 'nsfw_level': 0, 'premium_progress_bar_enabled': False,
+        }
+        self.members[guild_id] = {self.application_id: {'user': self.bot_user, 'roles': {admin_role}}}
+        for i in range(members):
+            user_id = self.snowflake()
+            self.members[guild_id][user_id] = {'user': self.user(user_id, f'member{i}'), 'roles': set()}
+        return guild_id
+
+    @staticmethod
+    def role(id: int, name: str, position: int, permissions: str = '0') -> dict:
+        return {
+            'id': str(id), 'name': name, 'color': 0, 'hoist': False, 'position': position, 'permissions': permissions,
+            'managed': False, 'mentionable': False, 'flags': 0, 'icon': None, 'unicode_emoji': None,
+        }
+
+    def channel_id(self, guild_id: int) -> int:
+        return int(self.guilds[guild_id]['channels'][0]['id'])
+
+    def message_payload(self, channel_id: int, payload: dict, message_id: Optional[int] = None) -> dict:
+        message_id = message_id or self.snowflake()
+        return {
+            'id': str(message_id), 'channel_id': str(channel_id), 'author': self.bot_user, 'type': 0, 'flags': payload.get('flags', 0),
+            'content': payload.get('content') or '', 'embeds': payload.get('embeds') or [], 'components': payload.get('components') or [],
+            'attachments': [], 'mentions': [], 'mention_roles': [], 'mention_everyone': False, 'pinned': False, 'tts': False,
+            'timestamp': discord.utils.utcnow().isoformat(), 'edited_timestamp': None,
+        }
+
+    # Gateway
+
+    async def send(self, op: int, data=None, event: Optional[str] = None) -> None:
+        payload = {'op': op, 'd': data}
+        if event:
+            self._seq += 1
+            payload.update(t=event, s=self._seq)
+        await self.ws.send_str(json.dumps(payload))
+
+    async def gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self.ws = ws
+        self._seq = 0
+        await self.send(10, {'heartbeat_interval': HEARTBEAT_INTERVAL_MS})
+        async for message in ws:
+            payload = json.loads(message.data)
+            op, data = payload['op'], payload.get('d')
+            if op == 1:
+                await self.send(11)
+            elif op == 2:
+                await self.identify()
+            elif op == 8:
+                await self.member_chunk(int(data['guild_id']), data.get('nonce'))
+        self.ws = None
+        return ws
+
+    async def identify(self) -> None:
+        await self.send(0, {
+            'v': 10, 'user': self.bot_user, 'session_id': 'load-test', 'resume_gateway_url': f'ws://127.0.0.1:{self.port}/gateway',
+            'guilds': [{'id': str(guild_id), 'unavailable': True} for guild_id in self.guilds],
+            'application': {'id': str(self.application_id), 'flags': 0},
+        }, 'READY')
+        for guild_id, guild in self.guilds.items():
+            # Only the bot's own member, like a large guild; the rest come from chunk requests
+            await self.send(0, {**guild, 'members': [self.member_payload(guild_id, self.application_id)]}, 'GUILD_CREATE')
+        self.identified.set()
+
+    async def member_chunk(self, guild_id: int, nonce: Optional[str]) -> None:
+        members = [self.member_payload(guild_id, user_id) for user_id in self.members.get(guild_id, {})]
+        await self.send(0, {'guild_id': str(guild_id), 'members': members, 'chunk_index': 0, 'chunk_count': 1, 'nonce': nonce}, 'GUILD_MEMBERS_CHUNK')
+
+    async def dispatch_interaction(self, guild_id: int, user_id: int, message: dict, custom_id: str, values: List[str]) -> FakeInteractionState:
+        """Push a dropdown click to the bot, like a member choosing `values` in `message`'s select."""
+        state = FakeInteractionState(self.snowflake(), f'token{self.snowflake()}')
+        self.interactions[state.token] = state
+        member = {**self.member_payload(guild_id, user_id), 'permissions': '0'}
+        await self.send(0, {
+            'id': str(state.id), 'application_id': str(self.application_id), 'type': 3, 'token': state.token, 'version': 1,
+            'guild_id': str(guild_id), 'channel_id': message['channel_id'],
+            'channel': {'id': message['channel_id'], 'type': 0, 'guild_id': str(guild_id), 'name': 'menus', 'position': 0, 'permission_overwrites': []},
+            'member': member, 'message': message, 'app_permissions': '8', 'locale': 'en-US', 'guild_locale': 'en-US',
+            'entitlements': [], 'authorizing_integration_owners': {'0': str(guild_id)}, 'context': 0,
+            'data': {'custom_id': custom_id, 'component_type': 3, 'values': values},
+        }, 'INTERACTION_CREATE')
+        return state
+
+    # REST
+
+    @web.middleware
+    async def simulate(self, request: web.Request, handler):
+        resource = request.match_info.route.resource
+        route = f"{request.method} {resource.canonical if resource else request.path}"
+        self.requests[route] += 1
+        if getattr(handler, 'limited', False):
+            await asyncio.sleep(max(0.0, self.random.gauss(self.latency, self.jitter)))
+            if self.rate_limit_ratio and self.random.random() < self.rate_limit_ratio:
+                return self.too_many_requests(route, self.retry_after)
+        return await handler(request)
+
+    def too_many_requests(self, route: str, retry_after: float) -> web.Response:
+        self.rate_limited[route] += 1
+        # discord.py treats a 429 without a Via header as a Cloudflare ban
+        return json_response(
+            {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': False},
+            status=429, headers={'Via': '1.1 fake-discord', 'Retry-After': str(retry_after), 'X-RateLimit-Scope': 'user'},
+        )
+
+    async def unknown_route(self, request: web.Request) -> web.Response:
+        self.unknown[f'{request.method} {request.path}'] += 1
+        return json_response({'code': 0, 'message': 'Not implemented by the fake server'}, status=404)
+
+    @staticmethod
+    async def body(request: web.Request) -> dict:
+        if request.content_type.startswith('multipart/'):
+            form = await request.post()
+            return json.loads(form['payload_json'])
+        return await request.json() if request.can_read_body else {}
+
+    async def get_me(self, request: web.Request) -> web.Response:
+        return json_response({**self.bot_user, 'verified': True, 'mfa_enabled': False, 'flags': 0})
+
+    async def get_application(self, request: web.Request) -> web.Response:
+        return json_response({
+            'id': str(self.application_id), 'name': 'LoadTestBot', 'description': '', 'icon': None, 'rpc_origins': [],
+            'bot_public': False, 'bot_require_code_grant': False, 'owner': self.user(self.snowflake(), 'owner'),
+            'team': None, 'verify_key': '0' * 64, 'flags': 0, 'summary': '',
+        })
+
+    async def get_gateway(self, request: web.Request) -> web.Response:
+        return json_response({'url': f'ws://127.0.0.1:{self.port}/gateway', 'shards': 1,
+                                  'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 1}})
+
+    async def put_commands(self, request: web.Request) -> web.Response:
+        commands = await self.body(request)
+        scope = request.match_info.get('guild_id', 'global')
+        self.commands[scope] = [
+            {'id': str(self.snowflake()), 'application_id': str(self.application_id), 'version': '1', 'type': 1,
+             'default_member_permissions': None, 'dm_permission': True, 'nsfw': False, 'options': [], **command}
+            for command in commands
+        ]
+        return json_response(self.commands[scope])
+
+    async def send_message(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info['channel_id'])
+        message = self.message_payload(channel_id, await self.body(request))
+        self.messages[int(message['id'])] = message
+        return json_response(message)
+
+    async def get_message(self, request: web.Request) -> web.Response:
+        message = self.messages.get(int(request.match_info['message_id']))
+        if message is None:
+            return json_response({'code': 10008, 'message': 'Unknown Message'}, status=404)
+        return json_response(message)
+
+    async def edit_message(self, request: web.Request) -> web.Response:
+        message_id = int(request.match_info['message_id'])
+        if message_id not in self.messages:
+            return json_response({'code': 10008, 'message': 'Unknown Message'}, status=404)
+        message = self.messages[message_id]
+        message.update({key: value for key, value in (await self.body(request)).items() if key in ('content', 'embeds', 'components')})
+        message['edited_timestamp'] = discord.utils.utcnow().isoformat()
+        return json_response(message)
+
+    async def delete_message(self, request: web.Request) -> web.Response:
+        if self.messages.pop(int(request.match_info['message_id']), None) is None:
+            return json_response({'code': 10008, 'message': 'Unknown Message'}, status=404)
+        return web.Response(status=204)
+
+    def member_edit_allowed(self, guild_id: int) -> Optional[float]:
+        """None when the guild's member edit bucket has room, else the seconds until it has."""
+        if not self.member_edits_per_second:
+            return None
+        now = time.perf_counter()
+        window = [stamp for stamp in self._edit_tokens.get(guild_id, []) if now - stamp < 1.0]
+        self._edit_tokens[guild_id] = window
+        if len(window) >= self.member_edits_per_second:
+            return 1.0 - (now - window[0])
+        window.append(now)
+        return None
+
+    async def get_member(self, request: web.Request) -> web.Response:
+        guild_id, user_id = int(request.match_info['guild_id']), int(request.match_info['user_id'])
+        if user_id not in self.members.get(guild_id, {}):
+            return json_response({'code': 10007, 'message': 'Unknown Member'}, status=404)
+        return json_response(self.member_payload(guild_id, user_id))
+
+    async def edit_member(self, request: web.Request) -> web.Response:
+        guild_id, user_id = int(request.match_info['guild_id']), int(request.match_info['user_id'])
+        if user_id not in self.members.get(guild_id, {}):
+            return json_response({'code': 10007, 'message': 'Unknown Member'}, status=404)
+        wait = self.member_edit_allowed(guild_id)
+        if wait is not None:
+            return self.too_many_requests(f'{request.method} {request.match_info.route.resource.canonical}', round(wait, 3))
+        body = await self.body(request)
+        if 'roles' in body:
+            self.members[guild_id][user_id]['roles'] = {int(role_id) for role_id in body['roles']}
+        return json_response(self.member_payload(guild_id, user_id))
+
+    async def member_role(self, request: web.Request) -> web.Response:
+        guild_id, user_id = int(request.match_info['guild_id']), int(request.match_info['user_id'])
+        if user_id not in self.members.get(guild_id, {}):
+            return json_response({'code': 10007, 'message': 'Unknown Member'}, status=404)
+        wait = self.member_edit_allowed(guild_id)
+        if wait is not None:
+            return self.too_many_requests(f'{request.method} {request.match_info.route.resource.canonical}', round(wait, 3))
+        roles = self.members[guild_id][user_id]['roles']
+        role_id = int(request.match_info['role_id'])
+        if request.method == 'PUT':
+            roles.add(role_id)
+        else:
+            roles.discard(role_id)
+        return web.Response(status=204)
+
+    async def interaction_callback(self, request: web.Request) -> web.Response:
+        state = self.interactions.get(request.match_info['token'])
+        if state is None or state.expired:
+            return json_response({'code': 10062, 'message': 'Unknown interaction'}, status=404)
+        if state.ack is not None:
+            return json_response({'code': 40060, 'message': 'Interaction has already been acknowledged.'}, status=400)
+        elapsed = time.perf_counter() - state.dispatched
+        if elapsed > INTERACTION_DEADLINE:
+            state.expired = True
+            if not state.done.done():
+                state.done.set_result(state)
+            return json_response({'code': 10062, 'message': 'Unknown interaction'}, status=404)
+        state.ack = elapsed
+        body = await self.body(request)
+        if body.get('type') == 4:
+            self.reply(state, body.get('data') or {})
+        else:
+            state.deferred = True
+        return web.Response(status=204)
+
+    async def followup(self, request: web.Request) -> web.Response:
+        state = self.interactions.get(request.match_info['token'])
+        if state is None or state.ack is None:
+            return json_response({'code': 10015, 'message': 'Unknown Webhook'}, status=404)
+        payload = await self.body(request)
+        self.reply(state, payload)
+        if request.query.get('wait') in ('true', '1'):
+            return json_response(self.message_payload(0, payload))
+        return web.Response(status=204)
+
+    def reply(self, state: FakeInteractionState, payload: dict) -> None:
+        state.replies.append({**payload, 'at': time.perf_counter() - state.dispatched})
+        if self.is_final(payload) and not state.done.done():
+            state.done.set_result(state)
+
+    # Lifecycle
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.simulate], client_max_size=16 * 1024 * 1024)
+        routes = [
+            ('GET', '/gateway', self.gateway, False),
+            ('GET', f'{API}/users/@me', self.get_me, False),
+            ('GET', f'{API}/oauth2/applications/@me', self.get_application, False),
+            ('GET', f'{API}/gateway/bot', self.get_gateway, False),
+            ('PUT', f'{API}/applications/{{application_id}}/commands', self.put_commands, False),
+            ('PUT', f'{API}/applications/{{application_id}}/guilds/{{guild_id}}/commands', self.put_commands, False),
+            ('POST', f'{API}/channels/{{channel_id}}/messages', self.send_message, True),
+            ('GET', f'{API}/channels/{{channel_id}}/messages/{{message_id}}', self.get_message, True),
+            ('PATCH', f'{API}/channels/{{channel_id}}/messages/{{message_id}}', self.edit_message, True),
+            ('DELETE', f'{API}/channels/{{channel_id}}/messages/{{message_id}}', self.delete_message, True),
+            ('GET', f'{API}/guilds/{{guild_id}}/members/{{user_id}}', self.get_member, True),
+            ('PATCH', f'{API}/guilds/{{guild_id}}/members/{{user_id}}', self.edit_member, True),
+            ('PUT', f'{API}/guilds/{{guild_id}}/members/{{user_id}}/roles/{{role_id}}', self.member_role, True),
+            ('DELETE', f'{API}/guilds/{{guild_id}}/members/{{user_id}}/roles/{{role_id}}', self.member_role, True),
+            ('POST', f'{API}/interactions/{{interaction_id}}/{{token}}/callback', self.interaction_callback, True),
+            ('POST', f'{API}/webhooks/{{application_id}}/{{token}}', self.followup, True),
+        ]
+        for method, path, handler, limited in routes:
+            # Only data routes get latency and 429s, logging in and syncing commands stay fast
+            async def route(request, handler=handler):
+                return await handler(request)
+            route.limited = limited
+            app.router.add_route(method, path, route)
+        app.router.add_route('*', '/{tail:.*}', self.unknown_route)
+        return app
+
+    async def start(self, port: int = 0) -> None:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def point_client_here(self) -> None:
+        """Send discord.py's REST, webhook and gateway traffic to this server instead of Discord."""
+        base = f'http://127.0.0.1:{self.port}{API}'
+        discord.http.Route.BASE = base
+        discord.webhook.async_.Route.BASE = base
+        discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = discord.gateway.yarl.URL(f'ws://127.0.0.1:{self.port}/gateway')
+
+    async def close(self) -> None:
+        if self.ws is not None:
+            await self.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
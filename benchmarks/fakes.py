@@ -0,0 +1,106 @@
+# Lightweight stand-ins for the discord.py objects the role menus touch, so benchmarks run without a gateway or REST.
+# Only the attributes the bot reads are implemented; REST methods can be given a simulated round trip.
+import asyncio
+from typing import List, Optional
+import discord
+from utils.roledropdowns import RoleMenuSelect
+
+
+class FakeRole:
+    def __init__(self, id: int, name: str, position: int, guild: 'FakeGuild') -> None:
+        self.id = id
+        self.name = name
+        self.position = position
+        self.guild = guild
+
+    def __repr__(self) -> str:
+        return f'<FakeRole {self.id} {self.name!r}>'
+
+
+class FakeGuild:
+    """A guild with `@everyone` plus `role_count` roles spread over the default categories.
+
+    Role names cycle through NA/JP XP roles, ranks, pings and unrelated roles,
+    so every category matcher sees both hits and misses.
+    """
+
+    NAMES = ('NA {n} XP', 'JP {n} XP', 'Rank {n}', 'Ping {n}', 'Team {n}', 'Color {n}')
+
+    def __init__(self, id: int, role_count: int) -> None:
+        self.id = id
+        self.roles: List[FakeRole] = [FakeRole(id, '@everyone', 0, self)]
+        for i in range(role_count):
+            name = self.NAMES[i % len(self.NAMES)].format(n=2000 + (i // len(self.NAMES)) * 10)
+            self.roles.append(FakeRole(id * 100_000 + i + 1, name, i + 1, self))
+        self._roles = {role.id: role for role in self.roles}
+        self.members: list = []
+        self._members = {}
+        self.chunked = True
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self._roles.get(role_id)
+
+    async def fetch_member(self, member_id: int) -> 'FakeMember':
+        member = self._members[member_id]
+        if member.round_trip:
+            await asyncio.sleep(member.round_trip)
+        return member
+
+
+class FakeMember:
+    def __init__(self, id: int, guild: FakeGuild, round_trip: float = 0.0) -> None:
+        self.id = id
+        self.guild = guild
+        self.roles = [guild.roles[0]]
+        self.round_trip = round_trip
+        self.edits = 0
+        guild._members[id] = self
+
+    async def edit(self, *, roles, reason: Optional[str] = None) -> None:
+        self.edits += 1
+        if self.round_trip:
+            await asyncio.sleep(self.round_trip)
+        self.roles = [self.guild.roles[0]] + [self.guild.get_role(role.id) for role in roles]
+
+
+class FakeResponse:
+    def __init__(self) -> None:
+        self.done = False
+        self.deferred = False
+        self.sent: Optional[dict] = None
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def send_message(self, content=None, **kwargs) -> None:
+        self.done = True
+        self.sent = {'content': content, **kwargs}
+
+    async def defer(self, **kwargs) -> None:
+        self.done = True
+        self.deferred = True
+
+
+class FakeFollowup:
+    def __init__(self) -> None:
+        self.sent: List[dict] = []
+
+    async def send(self, content=None, **kwargs) -> None:
+        self.sent.append({'content': content, **kwargs})
+
+
+class FakeInteraction:
+    def __init__(self, member: FakeMember) -> None:
+        self.user = member
+        self.guild = member.guild
+        self.guild_id = member.guild.id
+        self.created_at = discord.utils.utcnow()
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+
+def clicked_select(key: str, guild_id: int, message_id: int, values: List[str]) -> RoleMenuSelect:
+    """The RoleMenuSelect discord.py would build for a click, with the member's choice filled in."""
+    item = RoleMenuSelect(key, guild_id, message_id)
+    item.item._values = values
+    return item
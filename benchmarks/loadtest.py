@@ -0,0 +1,201 @@
+# End-to-end load test: a real botclient.Bot logs in to the fake Discord in benchmarks/fakediscord.py and
+# answers thousands of role menu clicks pushed over its gateway, through the real REST client, rate limit
+# handling, cogs, role queue and SQLite view store. Bot and fake server share one event loop and one process.
+# Reports throughput and ack/final reply latency percentiles; --out also writes them as JSON.
+# Run from the repository root:  python -m benchmarks.loadtest [--clicks 5000] [--concurrency 500] [--rate-limit-ratio 0.02]
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import List, Optional
+import discord
+import botclient
+import db.persistent_db as pdb
+from benchmarks.fakediscord import FakeDiscord, FakeInteractionState
+from benchmarks.fakes import FakeGuild
+from benchmarks.suite import metadata
+from utils.cacheprofile import PROFILES
+from utils.replypath import reply_stats
+from utils.rolecategories import role_categories
+from utils.roledropdowns import QUEUED_NOTICE, role_menu_view
+from utils.roleindex import role_index
+from utils.rolequeue import role_mutation_queue
+
+# Click timeouts are well past Discord's 3s deadline, a click only times out when the bot never answers
+CLICK_TIMEOUT = 30.0
+
+
+def percentiles(values: List[float]) -> dict:
+    if not values:
+        return {'n': 0}
+    ordered = sorted(values)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+    return {'n': len(ordered), 'p50': pick(50), 'p90': pick(90), 'p99': pick(99), 'max': ordered[-1]}
+
+
+def is_final(reply: dict) -> bool:
+    # The queued notice is a followup sent before the real answer
+    return reply.get('content') != QUEUED_NOTICE
+
+
+def post_menus(fake: FakeDiscord, bot: botclient.Bot, keys: List[str]) -> List[dict]:
+    """One menu message per guild and category, rendered by the bot's own code and stored on the fake server."""
+    menus = []
+    for guild_id in fake.guilds:
+        guild = bot.get_guild(guild_id)
+        for key in keys:
+            category = role_categories.get(guild_id, key)
+            message_id = fake.snowflake()
+            view = role_menu_view(category, guild_id, message_id, role_index.get(guild).roles(key))
+            message = fake.message_payload(fake.channel_id(guild_id), {'components': view.to_components()}, message_id)
+            fake.messages[message_id] = message
+            menus.append({'guild_id': guild_id, 'key': key, 'multi': category.multi_select, 'message': message})
+    return menus
+
+
+async def replay(fake: FakeDiscord, menus: List[dict], clicks: int, concurrency: int, rate: float, seed: int) -> List[Optional[FakeInteractionState]]:
+    """Dispatch `clicks` random menu choices, at most `concurrency` unanswered at a time and `rate` per second (0 = unpaced)."""
+    rng = random.Random(seed)
+    slots = asyncio.Semaphore(concurrency)
+    results: List[Optional[FakeInteractionState]] = []
+
+    async def click() -> None:
+        menu = rng.choice(menus)
+        options = [option['value'] for option in menu['message']['components'][0]['components'][0]['options']]
+        values = rng.sample(options, rng.randint(1, min(3, len(options)))) if menu['multi'] else [rng.choice(options)]
+        member_id = rng.choice([user_id for user_id in fake.members[menu['guild_id']] if user_id != fake.application_id])
+        custom_id = f"rs_{menu['key']}_{menu['guild_id']}_{menu['message']['id']}"
+        try:
+            state = await fake.dispatch_interaction(menu['guild_id'], member_id, menu['message'], custom_id, values)
+            try:
+                await asyncio.wait_for(asyncio.shield(state.done), CLICK_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            results.append(state)
+        finally:
+            slots.release()
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(clicks):
+        if rate:
+            await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+        await slots.acquire()
+        tasks.append(asyncio.create_task(click()))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def report(states: List[FakeInteractionState], elapsed: float, fake: FakeDiscord, bot: botclient.Bot, args) -> dict:
+    finals = [next((reply for reply in state.replies if is_final(reply)), None) for state in states]
+    answered = [(state, final) for state, final in zip(states, finals) if final is not None]
+    queue = role_mutation_queue.snapshot()
+    return {
+        'params': {key: value for key, value in vars(args).items() if key != 'out'},
+        'clicks': len(states),
+        'seconds': elapsed,
+        'clicks_per_sec': len(states) / elapsed if elapsed else None,
+        'answered': len(answered),
+        'deferred': sum(state.deferred for state in states),
+        'with_notice': sum(len(state.replies) > 1 for state in states),
+        'errors': sum(str(final.get('content') or '').startswith('❌') for _, final in answered),
+        'deadline_missed': sum(state.expired for state in states),
+        'timed_out': sum(not state.done.done() for state in states),
+        'ack_seconds': percentiles([state.ack for state in states if state.ack is not None]),
+        'final_seconds': percentiles([final['at'] for _, final in answered]),
+        'bot_reply_work': reply_stats.as_dict(),
+        'role_queue': {'depth_max': max((guild['depth_max'] for guild in queue['guilds'].values()), default=0),
+                       'rejected': sum(guild['rejected'] for guild in queue['guilds'].values())},
+        'server_requests': dict(fake.requests.most_common()),
+        'server_429s': dict(fake.rate_limited),
+        'server_unknown_routes': dict(fake.unknown),
+        'bot_rest_calls': dict(bot.rest_calls.by_route.most_common()),
+        'bot_rate_limited': bot.rate_limits.total,
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"{result['clicks']} clicks in {result['seconds']:.2f}s, {result['clicks_per_sec']:.1f}/s; "
+          f"{result['answered']} answered, {result['deferred']} deferred, {result['with_notice']} with queued notice, "
+          f"{result['errors']} error replies, {result['deadline_missed']} missed the 3s deadline, {result['timed_out']} never answered")
+    for name in ('ack_seconds', 'final_seconds'):
+        stats = result[name]
+        if stats['n']:
+            print(f"{name:<14} p50 {stats['p50'] * 1000:8.1f} ms  p90 {stats['p90'] * 1000:8.1f} ms  "
+                  f"p99 {stats['p99'] * 1000:8.1f} ms  max {stats['max'] * 1000:8.1f} ms")
+    print(f"role queue depth max {result['role_queue']['depth_max']}, rejected {result['role_queue']['rejected']}; "
+          f"429s sent {sum(result['server_429s'].values())}, logged by discord.http {result['bot_rate_limited']} (interaction 429s go through the webhook adapter)")
+    for route, count in result['server_requests'].items():
+        print(f"  {count:>7}  {route}")
+    if result['server_unknown_routes']:
+        print(f"Routes the fake server does not implement: {result['server_unknown_routes']}")
+
+
+async def run(args) -> dict:
+    fake = FakeDiscord(
+        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, rate_limit_ratio=args.rate_limit_ratio,
+        retry_after=args.retry_after, member_edits_per_second=args.member_edits_per_second, seed=args.seed,
+    )
+    fake.is_final = is_final
+    for i in range(args.guilds):
+        fake.add_guild([role.name for role in FakeGuild(i, args.roles).roles[1:]], args.members)
+    await fake.start()
+    fake.point_client_here()
+
+    intents = discord.Intents.default()
+    intents.members = True
+    profile = PROFILES[args.profile]
+    bot = botclient.Bot(command_prefix='}', help_command=None, cache_profile=profile, guild_ready_timeout=0.1, **profile.client_options(intents))
+    connection = None
+    try:
+        await bot.login('fake-token')
+        connection = asyncio.create_task(bot.connect(reconnect=False))
+        await asyncio.wait_for(bot.wait_until_ready(), 30)
+        menus = post_menus(fake, bot, args.categories)
+        start = time.perf_counter()
+        states = await replay(fake, menus, args.clicks, args.concurrency, args.rate, args.seed)
+        elapsed = time.perf_counter() - start
+        return report(states, elapsed, fake, bot, args)
+    finally:
+        await bot.close()
+        if connection is not None:
+            await asyncio.gather(connection, return_exceptions=True)
+        await fake.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Replay role menu clicks against a real Bot on a fake Discord.')
+    parser.add_argument('--clicks', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200, help='clicks waiting for their final reply at once')
+    parser.add_argument('--rate', type=float, default=0.0, help='clicks started per second, 0 = as fast as --concurrency allows')
+    parser.add_argument('--guilds', type=int, default=5)
+    parser.add_argument('--members', type=int, default=200, help='members per guild')
+    parser.add_argument('--roles', type=int, default=120, help='roles per guild, spread over the default categories')
+    parser.add_argument('--categories', nargs='+', default=['na', 'ping'], help='menus posted per guild')
+    parser.add_argument('--profile', choices=PROFILES, default='lean', help='cache profile the bot runs with')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='fake REST latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help='share of REST requests answered with a 429')
+    parser.add_argument('--retry-after', type=float, default=0.5, help='retry_after of the random 429s')
+    parser.add_argument('--member-edits-per-second', type=float, default=0.0, help="per-guild member edit limit, 0 = none")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    # No metrics port to collide with, and the views database is thrown away afterwards
+    os.environ['METRICS_PORT'] = '0'
+    with tempfile.TemporaryDirectory() as tmp:
+        pdb.DB_NAME = os.path.join(tmp, 'views.db')
+        result = asyncio.run(run(args))
+    print_report(result)
+    if args.out:
+        with open(args.out, 'w') as out:
+            json.dump({'meta': metadata(), 'result': result}, out, indent=2)
+        print(f"Wrote results to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+# Offline benchmark suite: role filtering, menu rendering, role menu callbacks and every persistent_db call,
+# run on the fakes in benchmarks/fakes.py and a temporary SQLite database. No network is used.
+# Results are written as JSON; --compare flags anything slower than a previous run by more than --tolerance.
+# Run from the repository root:  python -m benchmarks.suite [--out results.json] [--compare baseline.json] [--quick]
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+import discord
+import db.persistent_db as pdb
+from db.sqlite_store import SQLiteViewStore
+from benchmarks.fakes import FakeGuild, FakeInteraction, FakeMember, clicked_select
+from cogs.DEPRICATED_ROLES import Roles as LegacyRoles
+from cogs.role_refactor import Roles
+from utils.embeds import BotMessageEmbed
+from utils.loggingsetup import getlog
+from utils.rolecategories import DEFAULT_CATEGORIES, role_categories
+from utils.roledropdowns import RoleMenuSelect, role_menu_view
+from utils.roleindex import GuildRoleIndex, role_index
+from utils.rolequeue import role_mutation_queue
+
+NA, JP, RANK, PING = DEFAULT_CATEGORIES
+
+
+def summarize(name: str, durations: List[float], **params) -> dict:
+    ordered = sorted(durations)
+    mean = sum(ordered) / len(ordered)
+    return {
+        'name': name,
+        'params': params,
+        'n': len(ordered),
+        'mean': mean,
+        'p50': ordered[len(ordered) // 2],
+        'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        'min': ordered[0],
+        'ops_per_sec': 1 / mean if mean else None,
+    }
+
+
+def bench(name: str, run: Callable[[], object], repeat: int, **params) -> dict:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start)
+    return summarize(name, durations, **params)
+
+
+async def abench(name: str, run: Callable[[], Awaitable], repeat: int, **params) -> dict:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run()
+        durations.append(time.perf_counter() - start)
+    return summarize(name, durations, **params)
+
+
+def bench_role_filtering(sizes, repeat: int) -> List[dict]:
+    """The old per-menu scans of guild.roles against the category index that replaced them."""
+    results = []
+    categories = {category.key: category for category in DEFAULT_CATEGORIES}
+    for size in sizes:
+        guild = FakeGuild(1, size)
+        results += [
+            bench('roles.filter_xp_roles', lambda: LegacyRoles.filter_xp_roles(None, 'na', guild.roles, NA.min_value, NA.max_value), repeat, roles=size),
+            bench('roles.filter_rank_roles', lambda: LegacyRoles.filter_rank_roles(None, guild.roles), repeat, roles=size),
+            bench('roles.category_scan', lambda: [role for role in guild.roles if NA.matches(role.name)], repeat, roles=size),
+            bench('roles.index_build', lambda: GuildRoleIndex(guild.roles, categories), repeat, roles=size),
+        ]
+        index = GuildRoleIndex(guild.roles, categories)
+        results.append(bench('roles.index_lookup', lambda: index.roles('na'), repeat, roles=size))
+        renamed = guild.roles[1]
+
+        def update_and_lookup():
+            index.update(renamed)
+            index.roles('na')
+
+        results.append(bench('roles.index_update_lookup', update_and_lookup, repeat, roles=size))
+    return results
+
+
+def bench_menu_render(repeat: int) -> List[dict]:
+    """Option building for a posted or restored menu (what update_roles used to do), and its fingerprint."""
+    guild = FakeGuild(1, 1000)
+    results = []
+    for category in (NA, PING):
+        roles = role_index.get(guild).roles(category.key)
+
+        def render():
+            view = role_menu_view(category, guild.id, 2, roles)
+            Roles.menu_fingerprint(view, BotMessageEmbed(title=category.title, description=category.description))
+
+        results += [
+            bench('menu.render_select', lambda: RoleMenuSelect.render(category, guild.id, 2, roles), repeat, category=category.key, options=min(len(roles), 25)),
+            bench('menu.render_view_fingerprint', render, repeat, category=category.key, options=min(len(roles), 25)),
+        ]
+    role_index.forget(guild.id)
+    return results
+
+
+async def bench_callbacks(clicks: int, guilds: int, members: int, round_trip_ms: float) -> dict:
+    """RoleMenuSelect.callback end to end (serializer, guild queue, reply), all clicks in flight at once."""
+    fake_guilds = [FakeGuild(1000 + i, 200) for i in range(guilds)]
+    fake_members = [FakeMember(g * members + m, guild, round_trip_ms / 1000) for g, guild in enumerate(fake_guilds) for m in range(members)]
+    rng = random.Random(0)
+    durations = []
+
+    async def click(member: FakeMember) -> None:
+        role = rng.choice(role_index.get(member.guild).roles('na'))
+        item = clicked_select('na', member.guild.id, 2, [str(role.id)])
+        interaction = FakeInteraction(member)
+        start = time.perf_counter()
+        await item.callback(interaction)
+        durations.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(click(fake_members[i % len(fake_members)]) for i in range(clicks)))
+    elapsed = time.perf_counter() - start
+    result = summarize('menu.callback', durations, clicks=clicks, guilds=guilds, members_per_guild=members, round_trip_ms=round_trip_ms)
+    result['clicks_per_sec'] = clicks / elapsed
+    result['member_edits'] = sum(member.edits for member in fake_members)
+    for guild in fake_guilds:
+        role_index.forget(guild.id)
+    return result
+
+
+async def bench_persistent_db(rows: int, repeat: int) -> List[dict]:
+    """Every persistent_db call the bot makes, against a database seeded with `rows` views."""
+    results = []
+    seed = [(guild_id, 1, guild_id * 10, 'na', None) for guild_id in range(rows)]
+    await pdb.apply_view_changes(seed, [])
+    ids = iter(range(10**9, 2 * 10**9))
+    no_guilds = type('FakeBot', (), {'get_guild': lambda self, guild_id: None})()
+
+    async def upsert():
+        await pdb.upsert_view(pdb.ViewType.RANK, next(ids), 1, next(ids), 'f' * 40)
+
+    async def insert():
+        await pdb.insert_view(pdb.ViewType.RANK, next(ids), 1, next(ids), no_guilds)
+
+    async def upsert_then_delete():
+        guild_id, message_id = next(ids), next(ids)
+        await pdb.upsert_view(pdb.ViewType.PING, guild_id, 1, message_id)
+        await pdb.delete_view(message_id, guild_id)
+
+    async def batch():
+        await pdb.apply_view_changes([(next(ids), 1, next(ids), 'jp', None) for _ in range(100)], [])
+
+    category_rows = [category.to_row() for category in DEFAULT_CATEGORIES]
+
+    async def delete_category():
+        await pdb.upsert_role_categories([(7, 'eu', 'xp', 'eu', None, None, False, 'EU', 'EU roles', None)], replace=True)
+        await pdb.delete_role_category(7, 'eu')
+
+    params = {'rows': rows}
+    results += [
+        await abench('db.fetch_view', lambda: pdb.fetch_view(pdb.ViewType.NA, rows // 2), repeat, **params),
+        await abench('db.fetch_all_views', pdb.fetch_all_views, max(3, repeat // 20), **params),
+        await abench('db.upsert_view', upsert, repeat, **params),
+        await abench('db.insert_view', insert, repeat, **params),
+        await abench('db.upsert_then_delete_view', upsert_then_delete, repeat, **params),
+        await abench('db.apply_view_changes', batch, max(3, repeat // 10), batch=100, **params),
+        await abench('db.custom_query', lambda: pdb.custom_query("SELECT COUNT(*) FROM views WHERE view_type = ?", 'na'), repeat, **params),
+        await abench('db.fetch_role_categories', pdb.fetch_role_categories, repeat, **params),
+        await abench('db.upsert_role_categories', lambda: pdb.upsert_role_categories(category_rows, replace=False), repeat, **params),
+        await abench('db.upsert_then_delete_role_category', delete_category, repeat, **params),
+        await abench('db.set_state', lambda: pdb.set_state('bench', 'x' * 200), repeat, **params),
+        await abench('db.get_state', lambda: pdb.get_state('bench'), repeat, **params),
+    ]
+    return results
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'discord.py': discord.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def compare(results: List[dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Names and slowdowns of benchmarks whose p50 grew by more than `tolerance` against the baseline."""
+    with open(baseline_path) as baseline_file:
+        baseline = {(r['name'], json.dumps(r['params'], sort_keys=True)): r for r in json.load(baseline_file)['results']}
+    regressions = []
+    for result in results:
+        before = baseline.get((result['name'], json.dumps(result['params'], sort_keys=True)))
+        if before and before['p50'] and result['p50'] > before['p50'] * (1 + tolerance):
+            regressions.append(f"{result['name']} {result['params']}: p50 {before['p50'] * 1e6:.1f} -> {result['p50'] * 1e6:.1f} us")
+    return regressions
+
+
+async def run(quick: bool) -> List[dict]:
+    repeat = 20 if quick else 200
+    results = bench_role_filtering((1000,) if quick else (1000, 5000), repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdb.use_store(SQLiteViewStore(os.path.join(tmp, 'views.db')))
+        await pdb.open_db()
+        try:
+            await pdb.setup_db()
+            # Menus and callbacks read categories from the registry, seeded with the defaults here
+            await role_categories.load()
+            results += bench_menu_render(repeat)
+            for round_trip_ms in (0.0, 20.0):
+                results.append(await bench_callbacks(200 if quick else 2000, guilds=10, members=20, round_trip_ms=round_trip_ms))
+            results += await bench_persistent_db(100 if quick else 1000, repeat)
+        finally:
+            role_mutation_queue.close()
+            # The connection's worker thread would otherwise keep the process alive
+            await pdb.close_db()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Offline benchmarks of role filtering, menu rendering, role menu callbacks and persistent_db.')
+    parser.add_argument('--out', default='benchmark-results.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='previous results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown against --compare, 0.25 = 25%%')
+    parser.add_argument('--quick', action='store_true', help='fewer repeats and smaller inputs')
+    args = parser.parse_args()
+
+    # Log records would be measured along with the code, and the database calls log on every call
+    getlog().setLevel(logging.WARNING)
+    results = asyncio.run(run(args.quick))
+
+    print(f"{'benchmark':<36} {'params':<64} {'p50 us':>10} {'p99 us':>10}")
+    for result in results:
+        params = ' '.join(f'{key}={value}' for key, value in result['params'].items())
+        print(f"{result['name']:<36} {params:<64} {result['p50'] * 1e6:>10.1f} {result['p99'] * 1e6:>10.1f}")
+
+    with open(args.out, 'w') as out:
+        json.dump({'meta': {**metadata(), 'quick': args.quick}, 'results': results}, out, indent=2)
+    print(f"Wrote {len(results)} results to {args.out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
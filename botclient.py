@@ -1,15 +1,73 @@
-from cogs import extensions
+from cogs import extensions, lazy_extensions, reload_modules
+import asyncio
+import importlib
+import math
+import sys
 import asyncpg
+import discord
+import time
+from os import getenv
+from typing import Optional
+from discord import app_commands
 from discord.ext import commands
-from db.persistent_db import setup_db
+from db.persistent_db import configure_store, open_db, close_db, setup_db
+from db.view_registry import view_registry
+from db.write_behind import view_write_queue
 from utils.loggingsetup import getlog
+from utils.commandsync import sync_command_tree
+from utils.startup import StartupTimeline
+from utils.cacheprofile import CacheProfile, PROFILES, resident_memory_mb
+from utils.restcalls import RestCallCounter, RateLimitCounter
+from utils.looplag import enable_slow_callback_warnings, loop_lag
+from utils.metrics import Gauge, MetricsServer, gateway_latency_seconds, metrics
+from utils.rolequeue import role_mutation_queue
+from utils.rolecategories import role_categories
+
+
+class LazyCommandTree(app_commands.CommandTree):
+    """Loads the lazy cogs when a command arrives that no loaded cog provides.
+
+    Discord keeps commands registered between runs, so a lazy cog's commands
+    can be used before finish_startup gets to it. interaction_check runs before
+    the command is looked up, so the command is found once the cog is in.
+    """
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        data = interaction.data or {}
+        name = data.get('name')
+        if name and not self.client.lazy_loaded:
+            command_type = discord.AppCommandType(data.get('type', 1))
+            if self.get_command(name, type=command_type) is None and \
+                    self.get_command(name, guild=interaction.guild, type=command_type) is None:
+                getlog().info(f'/{name} used before the lazy cogs loaded, loading them now')
+                await self.client.load_lazy_extensions()
+        return True
 
 
 class Bot(commands.Bot):
-    def __init__(self, *args, **kwargs) -> None:
+    def __init__(self, *args, cache_profile: CacheProfile = PROFILES['full'], timeline: Optional[StartupTimeline] = None, **kwargs) -> None:
+        kwargs.setdefault('tree_cls', LazyCommandTree)
         super().__init__(*args, **kwargs)
+        self.lazy_loaded = not lazy_extensions
+        # Per-phase startup timings, saved to bot_state once the bot is ready
+        self.timeline = timeline or StartupTimeline()
+        self.gateway_started = None
+        self.startup_report = None
+        self.extension_loads = {}
+        # Chunking, member and message caching options were passed in kwargs, see run_bot.py
+        self.cache_profile = cache_profile
+        self.started_at = time.perf_counter()
+        self.ready_report = None
+        self.commands_synced = None
         self.db_pool: asyncpg.Pool | None = None
         self.cog_counter = 0
+        # Every REST request made through self.http is counted, see restore_views for a consumer
+        self.rest_calls = RestCallCounter()
+        self.rest_calls.install(self.http)
+        # 429s are only visible in discord.py's log records, which this counts per route and guild
+        self.rate_limits = RateLimitCounter()
+        self.rate_limits.install()
+        self.metrics_server: Optional[MetricsServer] = None
         self.whitelist = { # set of discord ids
             363517227535826958,
             747592200887599195,
@@ -19,22 +77,168 @@ class Bot(commands.Bot):
 
     async def setup_hook(self) -> None:
         getlog().info('Running bot setup_hook...')
-        await setup_db()
-        for i, cog in enumerate(extensions, 1):
-            try:
-                # Load all added cogs into the bot
-                await self.load_extension(f'cogs.{cog}')
-                getlog().info(F'{cog} cog loaded ({i}/{len(extensions)})')
-            except Exception as e:
-                getlog().error(F'Could not load {cog} cog ({i}/{len(extensions)}): {e}')
-        
+        with self.timeline.phase('db setup'):
+            # Views go to Postgres when run_bot.py created a pool, otherwise to one shared SQLite connection
+            configure_store(self.db_pool)
+            await open_db()
+            await setup_db()
+            # Every view lookup after this point is served from memory
+            await view_registry.load()
+            # Role menu categories are compiled once here and shared by every guild
+            await role_categories.load()
+
+        await self.start_metrics()
+        # Lag percentiles, plus the stack of whatever blocks the loop past LOOP_LAG_THRESHOLD
+        loop_lag.start()
+        if getenv('LOOP_DEBUG'):
+            enable_slow_callback_warnings(self.loop, loop_lag.threshold)
+
+        # Cogs do not depend on each other, so their setup and cog_load run concurrently
+        eager = [cog for cog in extensions if cog not in lazy_extensions]
+        with self.timeline.phase('cogs'):
+            await asyncio.gather(*(self.ensure_extension(cog) for cog in eager))
+
         # Persistent views are automatically set up when cogs with persistent views are loaded
         # The cog_load() method handles this
+
+        # Synced once per process and only when the commands changed, never from on_ready (which repeats on reconnect).
+        # With lazy cogs the tree is only complete after they load, see finish_startup
+        if not lazy_extensions:
+            await self.sync_commands()
+        self.loop.create_task(self.finish_startup())
+        self.gateway_started = time.perf_counter()
         getlog().info('Ran bot setup_hook!')
 
+    async def start_metrics(self) -> None:
+        # Prometheus text on METRICS_HOST:METRICS_PORT/metrics, METRICS_PORT=0 turns it off
+        port = int(getenv('METRICS_PORT', '9108'))
+        if not port:
+            return
+        metrics.register(Gauge('bot_guilds', 'Guilds the bot is in', lambda: len(self.guilds)))
+        metrics.register(Gauge('bot_tracked_views', 'Role menus tracked in the view registry', lambda: len(view_registry)))
+        metrics.register(Gauge('bot_role_queue_depth', 'Role edits waiting in the mutation queue, all guilds', role_mutation_queue.total_depth))
+        self.metrics_server = MetricsServer(metrics, getenv('METRICS_HOST', '127.0.0.1'), port)
+        try:
+            await self.metrics_server.start()
+        except OSError as e:
+            getlog().error(f'Could not start metrics server on port {port}: {e}')
+            self.metrics_server = None
+            return
+        self.loop.create_task(self.sample_gateway_latency())
+
+    async def sample_gateway_latency(self) -> None:
+        await self.wait_until_ready()
+        last = None
+        while not self.is_closed():
+            # discord.py only updates latency when a heartbeat is acknowledged, so a repeated value is the same heartbeat
+            latency = self.latency
+            if latency != last and math.isfinite(latency):
+                gateway_latency_seconds.observe(latency)
+                last = latency
+            await asyncio.sleep(5)
+
+    async def ensure_extension(self, cog: str) -> bool:
+        """Load cogs.<cog> unless it is loaded or loading already. Returns whether it loaded."""
+        task = self.extension_loads.get(cog)
+        if task is None:
+            task = self.extension_loads[cog] = asyncio.ensure_future(self.load_cog(cog))
+        loaded = await task
+        if not loaded and self.extension_loads.get(cog) is task:
+            # Forget the failed load, so the next command or ready that needs the cog tries again
+            del self.extension_loads[cog]
+        return loaded
+
+    async def load_cog(self, cog: str) -> bool:
+        start = time.perf_counter()
+        try:
+            await self.load_extension(f'cogs.{cog}')
+            getlog().info(F'{cog} cog loaded')
+            return True
+        except Exception as e:
+            getlog().error(F'Could not load {cog} cog: {e}')
+            return False
+        finally:
+            self.timeline.record(f'cog {cog}', start)
+
+    async def reload_cog(self, cog: str) -> dict:
+        """Reload cogs.<cog> in place, after re-importing its helper modules from cogs.reload_modules.
+
+        The process, gateway session and module-level caches are untouched, so the
+        reloaded cog restores its menus from memory. If the new cog fails to load,
+        discord.py puts the old one back and the error is raised.
+        """
+        start = time.perf_counter()
+        modules = [module for module in reload_modules.get(cog, []) if module in sys.modules]
+        for module in modules:
+            importlib.reload(sys.modules[module])
+        await self.reload_extension(f'cogs.{cog}')
+        # Only uploads the tree when the reload changed a command, see sync_command_tree
+        await self.sync_commands()
+        report = {
+            'cog': cog,
+            'modules': modules,
+            'seconds': time.perf_counter() - start,
+            'commands_synced': self.commands_synced,
+        }
+        getlog().info(f'Reloaded {cog} cog: {report}')
+        return report
+
+    async def finish_startup(self) -> None:
+        await self.wait_until_ready()
+        self.timeline.record('first ready', self.gateway_started)
+        if lazy_extensions:
+            with self.timeline.phase('lazy cogs'):
+                await self.load_lazy_extensions()
+            await self.sync_commands()
+        self.startup_report = await self.timeline.save()
+
+    async def load_lazy_extensions(self) -> None:
+        """Load every lazy cog, once; called after the first ready or by the first command that needs one."""
+        lazy = [cog for cog in lazy_extensions if cog in extensions]
+        await asyncio.gather(*(self.ensure_extension(cog) for cog in lazy))
+        self.lazy_loaded = True
+
+    async def sync_commands(self) -> None:
+        # DEV_GUILD_ID syncs to that guild only, where changes show up immediately, and leaves global commands alone
+        dev_guild_id = getenv('DEV_GUILD_ID')
+        guild = discord.Object(id=int(dev_guild_id)) if dev_guild_id else None
+        if guild:
+            self.tree.copy_global_to(guild=guild)
+        try:
+            with self.timeline.phase('tree sync'):
+                self.commands_synced = await sync_command_tree(self, guild, force=bool(getenv('FORCE_COMMAND_SYNC')))
+        except discord.HTTPException as e:
+            getlog().error(f'Command tree sync failed: {e}')
+
+    async def close(self) -> None:
+        await super().close()
+        loop_lag.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        role_mutation_queue.close()
+        # Pending view writes must land before the connection goes away
+        await view_write_queue.close()
+        await close_db()
+
     async def on_ready(self) -> None:
-        tree = await self.tree.sync()
-        ready_msg_tree = f'Synced {len(tree)} tree commands.'
+        if self.ready_report is None:
+            # on_ready fires again after reconnects, only the first one measures startup
+            self.ready_report = {
+                'profile': self.cache_profile.name,
+                'seconds_to_ready': time.perf_counter() - self.started_at,
+                'rss_mb': resident_memory_mb(),
+                'guilds': len(self.guilds),
+                'cached_members': sum(len(guild.members) for guild in self.guilds),
+                'max_messages': self.cache_profile.max_messages,
+            }
+            getlog().info(f"Ready with cache profile {self.ready_report['profile']}: {self.ready_report}")
+
+        if not self.lazy_loaded:
+            ready_msg_tree = 'Command tree is synced once the lazy cogs load.'
+        elif self.commands_synced is None:
+            ready_msg_tree = 'Command tree unchanged, not synced.'
+        else:
+            ready_msg_tree = f'Synced {self.commands_synced} tree commands.'
         ready_msg_cogs = f'Loaded {len(extensions)} {'cogs' if len(extensions) > 1 else 'cog'}'
         bot_ready_msg = 'Bot ready'
 
@@ -4,3 +4,25 @@ extensions = [
     'role_refactor', # role_refactor.py
     
 ]
+
+# Extensions from the list above that are loaded after the bot is ready instead of during startup,
+# or earlier when one of their commands is used first (see LazyCommandTree in botclient.py).
+# Their commands are synced after they load, listeners miss events from before that point,
+# so only cogs that are nothing but commands belong here.
+lazy_extensions = [
+]
+
+# Helper modules that /reload re-imports before reloading the cog that uses them, dependencies first,
+# since a module keeps the objects it imported from the old copy of a dependency until it is reloaded too.
+# Only modules without lasting state belong here. The registries, indexes, queues, metrics and the loop
+# lag monitor are module-level singletons in db/ and utils/, kept outside the cogs so their contents
+# survive a cog reload; their modules are never re-imported. roleserializer is one of them, it calls
+# rolediff through the module so it picks up the reloaded functions.
+reload_modules = {
+    'role_refactor': [
+        'utils.rolediff',
+        'utils.roledropdowns',  # imports rolediff
+        'utils.rolerefresher',
+        'utils.restorescheduler',
+    ],
+}
@@ -2,7 +2,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from cogs import extensions
-from utils.embeds import BotMessageEmbed, BotConfirmationEmbed
+from utils.embeds import BotMessageEmbed, BotConfirmationEmbed, BotErrorEmbed
 from utils.loggingsetup import getlog
 
 
@@ -49,6 +49,41 @@ class Moderation(commands.Cog):
             description='https://github.com/JOwen-ster/Comp-Splatoon-Discord-Bot')
         )
 
+    async def extension_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=cog, value=cog)
+            for cog in extensions
+            if current.lower() in cog.lower()
+        ][:25]
+
+    @app_commands.command(name='reload', description='Reload a cog without restarting the bot')
+    @app_commands.describe(cog='Cog to reload, its helper modules from cogs.reload_modules are reloaded with it')
+    @app_commands.autocomplete(cog=extension_autocomplete)
+    async def reload_cog(self, interaction: discord.Interaction, cog: str):
+        await interaction.response.defer(ephemeral=True)
+
+        if interaction.user.id not in self.bot.whitelist:
+            return
+
+        if cog not in extensions:
+            await interaction.followup.send(embed=BotErrorEmbed(description=f"❌ Unknown cog `{cog}`."), ephemeral=True)
+            return
+
+        try:
+            report = await self.bot.reload_cog(cog)
+        except Exception as e:
+            # A failed load leaves the previous version of the cog running
+            getlog().error(f'Could not reload {cog} cog: {e}')
+            await interaction.followup.send(embed=BotErrorEmbed(description=f"❌ Could not reload `{cog}`: {e}"), ephemeral=True)
+            return
+
+        modules = ', '.join(report['modules']) or 'none'
+        synced = 'unchanged' if report['commands_synced'] is None else f"{report['commands_synced']} synced"
+        await interaction.followup.send(
+            embed=BotConfirmationEmbed(description=f"✅ Reloaded `{cog}` in {report['seconds']:.2f}s.\nModules: {modules}\nCommands: {synced}"),
+            ephemeral=True
+        )
+
 # Add the cog to your discord bot.
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
@@ -3,160 +3,264 @@ from discord.ext import commands
 from discord import app_commands
 from cogs import extensions
 import utils.roledropdowns as rdd
-from utils.embeds import BotMessageEmbed, BotErrorEmbed, BotConfirmationEmbed
+from utils.embeds import BotMessageEmbed, BotErrorEmbed, BotConfirmationEmbed, createEmbedFields
 from utils.loggingsetup import getlog
-from db.persistent_db import ViewType, fetch_view, insert_view, delete_view, fetch_all_views, print_all_views
+from utils.rolecategories import DEFAULT_CATEGORIES, RoleCategory, role_categories
+from utils.roleindex import role_index
+from utils.looplag import loop_lag
+from utils.replypath import reply_stats
+from utils.rolequeue import role_mutation_queue
+from utils.rolerefresher import RoleMenuRefresher
+from utils.restorescheduler import RestoreScheduler, RestoreProgress, RESTORED, DELETED, FORBIDDEN, FAILED
+from db.persistent_db import ViewType
+from db.view_registry import view_registry
+from typing import Literal, Optional
+import hashlib
+import json
 import re
+import time
+from os import getenv
 
 
 class Roles(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Both modes only edit menus whose roles changed. 'register' edits through a partial message and
+        # makes no call for unchanged menus; 'edit' fetches every menu first, unchanged ones included, so
+        # menus deleted while the bot was offline are dropped at startup, at one extra call per menu
+        self.restore_mode = getenv('VIEW_RESTORE_MODE', 'register').lower()
+        self.last_restore = None
+        self.restore_progress = RestoreProgress()
+        # Bounded by the REST budget, not by the number of stored rows
+        self.restore_scheduler = RestoreScheduler(
+            concurrency=int(getenv('RESTORE_CONCURRENCY', '8')),
+            rate=float(getenv('RESTORE_RATE_PER_SECOND', '40')),
+        )
+        # Role events are merged per guild and then each affected menu is edited once
+        self.refresher = RoleMenuRefresher(
+            self.refresh_guild_menus,
+            delay=float(getenv('ROLE_REFRESH_DELAY', '5')),
+            max_delay=float(getenv('ROLE_REFRESH_MAX_DELAY', '30')),
+        )
 
     async def cog_load(self):
-        self.bot.loop.create_task(self.restore_views())
+        # One handler for every role menu of every guild, matched by custom_id.
+        # The class is kept so cog_unload removes this one even after /reload re-imported roledropdowns
+        self.menu_item = rdd.RoleMenuSelect
+        self.bot.add_dynamic_items(self.menu_item)
+        # After a /reload this runs from the in-memory registry and only edits menus whose rendering changed,
+        # which also covers any refresh the old cog's refresher still had pending
+        self.restore_task = self.bot.loop.create_task(self.restore_views())
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(self.menu_item)
+        self.refresher.cancel()
+        # A restore still running from this instance would otherwise race the reloaded cog's own restore
+        self.restore_task.cancel()
 
     async def restore_views(self):
-        # USE CHANNEL ID AND GUILD ID INSTEAD OF ITERATING THROUGH CHANNELS AND GUILDS TO CHECK IF A VIEW WAS DELETED WHEN THE BOT WAS OFFLINE.
+        # Guilds and channels come from the gateway cache, so stale rows are found without any REST call
         await self.bot.wait_until_ready()
-        getlog().info("Loading persisted views from database...")
+        getlog().info(f"Restoring persisted views ({self.restore_mode} mode)...")
+        start = time.perf_counter()
+        rest_calls_before = self.bot.rest_calls.total
+
+        # Loaded in setup_hook, (guild_id, channel_id, view_type, message_id). Several instances or shards can
+        # share the views table, so each restores only the guilds it is connected to and leaves the rest alone
+        rows = [row for row in view_registry.all() if self.bot.get_guild(row.guild_id)]
+        getlog().info(f"{len(rows)} of {len(view_registry)} persisted views belong to guilds on this connection.")
+        self.restore_progress = RestoreProgress(total=len(rows))
+
+        # Message routes are rate limited per channel, so each channel is one bucket
+        await self.restore_scheduler.run(
+            rows,
+            bucket=lambda row: row.channel_id,
+            job=self.restore_one,
+            progress=self.restore_progress,
+        )
 
-        rows = await fetch_all_views()  # returns (guild_id, channel_id, view_type, message_id)
+        # Stale rows removed during the restore are committed together in one transaction
+        await view_registry.writer.flush()
+
+        self.last_restore = {
+            'mode': self.restore_mode,
+            **self.restore_progress.as_dict(),
+            'rest_calls': self.bot.rest_calls.total - rest_calls_before,
+            'seconds': time.perf_counter() - start,
+        }
+        getlog().info(f"Restored persisted views: {self.last_restore}")
+
+    async def restore_one(self, row) -> str:
+        guild_id, channel_id, view_type, message_id, stored_fingerprint = row
+        # Per-row records are lazy and rate limited (LOG_RATE_LIMITS), a restore logs thousands of them
+        getlog().debug("Attempting to restore: guild=%s, channel=%s, type=%s, message=%s", guild_id, channel_id, view_type, message_id)
+
+        # Get guild
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            # Left the guild since the restore started; on_guild_remove drops its views
+            getlog().warning(f"Guild {guild_id} not found. Skipping restoration.")
+            return FAILED
+
+        # Get channel
+        channel = guild.get_channel(channel_id)
+        if not channel:
+            getlog().warning(f"Channel {channel_id} not found in guild {guild_id}. Removing this view from DB.")
+            await view_registry.remove(message_id)
+            return DELETED
+
+        category = role_categories.get(guild_id, view_type)
+        if category is None:
+            getlog().warning(f"Unknown role category '{view_type}' in guild {guild_id}. Skipping.")
+            return FAILED
+        view, embed, fingerprint = self.render_menu(category, guild, message_id)
+
+        # Restore correct view
+        try:
+            if self.restore_mode == 'edit':
+                async with self.restore_scheduler.rest_slot():
+                    message = await channel.fetch_message(message_id)
+                if fingerprint == stored_fingerprint:
+                    self.restore_progress.skipped += 1
+                else:
+                    async with self.restore_scheduler.rest_slot():
+                        await message.edit(embed=embed, view=view)
+                    self.restore_progress.edited += 1
+            elif fingerprint == stored_fingerprint:
+                # The message already shows these roles and RoleMenuSelect handles its clicks by custom_id
+                self.restore_progress.skipped += 1
+            else:
+                async with self.restore_scheduler.rest_slot():
+                    await channel.get_partial_message(message_id).edit(embed=embed, view=view)
+                self.restore_progress.edited += 1
+        except discord.NotFound:
+            getlog().warning(f"Message {message_id} not found in channel {channel_id} (guild {guild_id}). Removing this view from DB.")
+            await view_registry.remove(message_id)
+            return DELETED
+        except discord.Forbidden:
+            getlog().warning(f"No permission to access channel {channel_id} in guild {guild_id}. Skipping restoration.")
+            return FORBIDDEN
+        except discord.HTTPException as e:
+            getlog().error(f"HTTP error while restoring message {message_id} in guild {guild_id}: {e}")
+            return FAILED
+
+        await view_registry.set_fingerprint(message_id, fingerprint)
+        getlog().info("Successfully restored %s view in guild %s (message %s).", view_type, guild_id, message_id)
+        return RESTORED
+
+    def render_menu(self, category: RoleCategory, guild: discord.Guild, message_id: int):
+        """Return (view, embed, fingerprint) for one category's menu in a guild."""
+        view = rdd.role_menu_view(category, guild.id, message_id, self.category_roles(category.key, guild))
+        embed = BotMessageEmbed(title=category.title, description=category.description)
+        return view, embed, self.menu_fingerprint(view, embed)
+
+    @staticmethod
+    def menu_fingerprint(view: discord.ui.View, embed: discord.Embed) -> str:
+        # Covers everything the message shows, so a changed role, placeholder or embed text all cause one edit
+        rendered = json.dumps([view.to_components(), embed.to_dict()], sort_keys=True)
+        return hashlib.sha1(rendered.encode()).hexdigest()
 
-        # MAYBE USE FETCH_ INSTEAD OF GET_ FOR REAL TIME API CALLs
-        for guild_id, channel_id, view_type, message_id in rows:
-            getlog().debug(f"Attempting to restore: guild={guild_id}, channel={channel_id}, type={view_type}, message={message_id}")
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.bot.cog_counter += 1
+        getlog().info(F'{__name__} ready ({self.bot.cog_counter}/{len(extensions)})')
 
-            # Get guild
-            guild = self.bot.get_guild(guild_id)
-            if not guild:
-                getlog().warning(f"Guild {guild_id} not found. Removing this view from DB.")
-                await delete_view(message_id, guild_id)
-                continue
+    # Raw events fire whether or not the message is in discord.py's cache, so menus posted
+    # before a restart are noticed too. Untracked deletes cost one dict lookup.
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if view_registry.is_tracked(payload.message_id):
+            await view_registry.remove(payload.message_id)
 
-            # Get channel
-            channel = guild.get_channel(channel_id)
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        removed = await view_registry.remove_many(payload.message_ids)
+        if removed:
+            getlog().info(f"Bulk delete in channel {payload.channel_id} removed {len(removed)} tracked views.")
+
+    async def track_view(self, key: str, post: discord.Message, fingerprint: str):
+        # Register the new menu first so deleting the old one is an untracked (no-op) delete
+        old = await view_registry.put(key, post.guild.id, post.channel.id, post.id, fingerprint)
+        if not old or old.message_id == post.id:
+            return
+        await self.delete_menu_message(old)
+
+    async def delete_menu_message(self, record):
+        # Callers untrack the record first, so the delete event that follows is a no-op
+        guild = self.bot.get_guild(record.guild_id)
+        channel = guild.get_channel(record.channel_id) if guild else None
+        if not channel:
+            return
+        try:
+            await channel.get_partial_message(record.message_id).delete()
+            getlog().info(f"Deleted old {record.view_type} view message {record.message_id} in guild {record.guild_id}.")
+        except discord.HTTPException as e:
+            getlog().warning(f"Could not delete old {record.view_type} view message {record.message_id} in guild {record.guild_id}: {e}")
+
+    def category_roles(self, key: str, guild: discord.Guild):
+        # Reads the per-guild role index, kept current by the role listeners below
+        return role_index.get(guild).roles(key)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        role_index.role_created(role)
+        self.refresher.mark(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        role_index.role_updated(after)
+        self.refresher.mark(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        role_index.role_deleted(role)
+        self.refresher.mark(role.guild.id)
+
+    async def refresh_guild_menus(self, guild_id: int):
+        # Menus whose fingerprint still matches are left alone, so unrelated role edits cost nothing
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
+        edited = 0
+        for record in view_registry.for_guild(guild_id):
+            category = role_categories.get(guild_id, record.view_type)
+            if category is None:
+                continue
+            view, embed, fingerprint = self.render_menu(category, guild, record.message_id)
+            if fingerprint == record.fingerprint:
+                continue
+            channel = guild.get_channel(record.channel_id)
             if not channel:
-                getlog().warning(f"Channel {channel_id} not found in guild {guild_id}. Removing this view from DB.")
-                await delete_view(message_id, guild_id)
                 continue
-
-            # Get message
             try:
-                message = await channel.fetch_message(message_id)
+                await channel.get_partial_message(record.message_id).edit(embed=embed, view=view)
             except discord.NotFound:
-                getlog().warning(f"Message {message_id} not found in channel {channel_id} (guild {guild_id}). Removing this view from DB.")
-                await delete_view(message_id, guild_id)
-                continue
-            except discord.Forbidden:
-                getlog().warning(f"No permission to access channel {channel_id} in guild {guild_id}. Skipping restoration.")
+                getlog().warning(f"Message {record.message_id} not found in guild {guild_id} while refreshing. Removing this view from DB.")
+                await view_registry.remove(record.message_id)
                 continue
             except discord.HTTPException as e:
-                getlog().error(f"HTTP error while fetching message {message_id} in guild {guild_id}: {e}")
+                getlog().error(f"Failed to refresh {record.view_type} view in guild {guild_id}: {e}")
                 continue
-
-            # Restore correct view
-            try:
-                if view_type == "na":
-                    roles = self.filter_xp_roles(
-                        key='na',
-                        iterable=guild.roles,
-                        xp_min=2000,
-                        xp_max=2900
-                    )
-                    view = rdd.RoleViewPowers(
-                        region_key='na',
-                        guild_id=guild_id,
-                        msg_id=message_id,
-                        bot=self.bot
-                    )
-                    view.update_roles(roles)
-                    await message.edit(view=view)
-
-                elif view_type == "jp":
-                    roles = self.filter_xp_roles(
-                        key='jp',
-                        iterable=guild.roles,
-                        xp_min=2000,
-                        xp_max=2900
-                    )
-                    view = rdd.RoleViewPowers(
-                        region_key='na',
-                        guild_id=guild_id,
-                        msg_id=message_id,
-                        bot=self.bot
-                    )
-                    view.update_roles(roles)
-                    await message.edit(view=view)
-
-                elif view_type == "rank":
-                    roles = self.filter_rank_roles(guild.roles)
-                    view = rdd.RoleViewRanks(
-                        guild_id=guild_id,
-                        msg_id=message_id,
-                        bot=self.bot,
-                    )
-                    view.update_roles(roles)
-                    await message.edit(view=view)
-
-                elif view_type == 'ping':
-                    ping_roles = self.filter_ping_roles(guild.roles)
-                    view = rdd.RoleViewPings(
-                        guild_id=guild_id,
-                        msg_id=message_id,
-                        bot=self.bot,
-                    )
-                    view.update_roles(ping_roles)
-                    await message.edit(view=view)
-
-                else:
-                    getlog().warning(f"Unknown view type '{view_type}' in guild {guild_id}. Skipping.")
-                    continue
-
-                getlog().info(f"Successfully restored {view_type} view in guild {guild_id} (message {message_id}).")
-
-            except Exception as e:
-                getlog().error(f"Failed to restore view {view_type} in guild {guild_id}: {e}")
+            await view_registry.set_fingerprint(record.message_id, fingerprint)
+            edited += 1
+        if edited:
+            getlog().info(f"Refreshed {edited} role menus in guild {guild_id} after role changes.")
 
     @commands.Cog.listener()
-    async def on_ready(self):
-        self.bot.cog_counter += 1
-        getlog().info(F'{__name__} ready ({self.bot.cog_counter}/{len(extensions)})')
+    async def on_guild_available(self, guild: discord.Guild):
+        # Roles may have changed while the guild was unavailable, rebuild on next use
+        role_index.forget(guild.id)
 
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        if not message.guild:
-            return
-        has_embed = len(message.embeds) > 0
-        has_view = hasattr(message, "components") and len(message.components) > 0
-        if has_embed and has_view:
-            await delete_view(message.id, message.guild.id)
-
-    def filter_xp_roles(self, key: str, iterable, xp_min: int, xp_max: int):
-        filtered_roles = []
-        for role in iterable:
-            regex = re.search(r'(\d+)', role.name)
-            current_xp = int(regex.group(1)) if regex else 0
-            if xp_min <= current_xp <= xp_max and "xp" in role.name.lower() and key in role.name.lower():
-                filtered_roles.append(role)
-        return filtered_roles
-
-    def filter_rank_roles(self, iterable):
-        return [role for role in iterable if 'rank' in role.name.lower()]
-
-    def filter_ping_roles(self, iterable):
-        return [role for role in iterable if ('ping' in role.name.lower() or 'pings' in role.name.lower())]
-
-    async def send_power_dropdown(
-        self,
-        interaction: discord.Interaction,
-        view_type: ViewType,
-        region_key: str,
-        xp_min: int,
-        xp_max: int,
-        embed_title: str,
-        embed_description: str
-    ):
+    async def on_guild_remove(self, guild: discord.Guild):
+        role_index.forget(guild.id)
+        # The bot was kicked or the guild was deleted, its menus can never be restored.
+        # Only the instance connected to the guild sees this event, so shared tables stay intact
+        removed = await view_registry.remove_many([record.message_id for record in view_registry.for_guild(guild.id)])
+        if removed:
+            getlog().info(f"Removed {len(removed)} tracked views of guild {guild.id} after leaving it.")
+
+    async def send_role_menu(self, interaction: discord.Interaction, key: str):
         await interaction.response.defer(ephemeral=True)
 
         if interaction.user.id not in self.bot.whitelist:
@@ -169,189 +273,185 @@ class Roles(commands.Cog):
             )
             return
 
-        # Delete old view if it exists
-        old_view_data = await fetch_view(view_type, interaction.guild.id)
-        if old_view_data:
-            old_channel = await interaction.guild.get_channel(old_view_data[3])
-            old_message_id = old_view_data[4]
-            try:
-                old_msg = await old_channel.fetch_message(old_message_id)
-                await old_msg.delete()
-            except discord.NotFound:
-                pass
-
-        # Prepare new roles
-        xp_roles = self.filter_xp_roles(
-            key=region_key,
-            iterable=interaction.guild.roles,
-            xp_min=xp_min,
-            xp_max=xp_max
-        )
-
-        # Create embed
-        title_embed = BotMessageEmbed(
-            title=embed_title,
-            description=embed_description
-        )
+        category = role_categories.get(interaction.guild.id, key)
+        if category is None:
+            await interaction.followup.send(
+                embed=BotErrorEmbed(description=f"❌ Unknown role category `{key}`."),
+                ephemeral=True
+            )
+            return
 
-        # Send message
-        post = await interaction.channel.send(embed=title_embed)
-        print(post.id)
+        # Send message; the view needs its id for the custom_id
+        post = await interaction.channel.send(embed=BotMessageEmbed(title=category.title, description=category.description))
 
         # Create and attach view
-        view = rdd.RoleViewPowers(
-            region_key=region_key,
-            guild_id=post.guild.id,
-            msg_id=post.id,
-            bot=self.bot
-        )
-        view.update_roles(xp_roles)
-        await post.edit(view=view)
-
-        # Store in DB
-        await insert_view(
-            view_type,
-            interaction.guild.id,
-            interaction.channel.id,
-            post.id,
-            self.bot
-        )
+        view, embed, fingerprint = self.render_menu(category, interaction.guild, post.id)
+        await post.edit(embed=embed, view=view)
+
+        # Store in DB and remove the menu it replaces
+        await self.track_view(category.key, post, fingerprint)
 
         await interaction.followup.send(embed=BotConfirmationEmbed(description='✅ Sent New Dropdown!'))
 
+    async def category_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=key, value=key)
+            for key in role_categories.keys(interaction.guild_id or 0)
+            if current.lower() in key.lower()
+        ][:25]
+
+    @app_commands.command(name='role-menu', description='Get a dropdown for any role category')
+    @app_commands.autocomplete(category=category_autocomplete)
+    async def role_menu(self, interaction: discord.Interaction, category: str):
+        await self.send_role_menu(interaction, category)
+
     @app_commands.command(name="jp-roles", description="Get a dropdown to assign/remove roles")
     async def role_dropdown_jp(self, interaction: discord.Interaction):
-        await self.send_power_dropdown(
-            interaction=interaction,
-            view_type=ViewType.JP,
-            region_key='jp',
-            xp_min=2000,
-            xp_max=2900,
-            embed_title="Japan XP Roles",
-            embed_description="Select Your Takoroka Division Power"
-        )
+        await self.send_role_menu(interaction, ViewType.JP.value)
 
     @app_commands.command(name="na-roles", description="Get a dropdown to assign/remove roles")
     async def role_dropdown_na(self, interaction: discord.Interaction):
-        await self.send_power_dropdown(
-            interaction=interaction,
-            view_type=ViewType.NA,
-            region_key='na',
-            xp_min=2000,
-            xp_max=2900,
-            embed_title="Western XP Roles",
-            embed_description="Select Your Tentatek Division Power"
-        )
+        await self.send_role_menu(interaction, ViewType.NA.value)
 
     @app_commands.command(name='ranked-roles', description='Get a dropdown of ranks to assign/remove roles')
     async def ranked_dropdown(self, interaction: discord.Interaction):
+        await self.send_role_menu(interaction, ViewType.RANK.value)
+
+    @app_commands.command(name='ping-roles', description='Get a drodown of pingable roles to assign/remove')
+    async def ping_dropdown(self, interaction: discord.Interaction):
+        await self.send_role_menu(interaction, ViewType.PING.value)
+
+    @app_commands.command(name='role-category', description='Add or change a role menu category')
+    @app_commands.describe(
+        key='Short name of the category, e.g. eu',
+        matcher='xp: name has "xp" and the pattern, keyword: name has the pattern, regex: pattern is a regex',
+        pattern='Text or regular expression role names are matched against',
+        all_guilds='Change the default every guild uses instead of only this guild',
+    )
+    async def role_category(
+        self,
+        interaction: discord.Interaction,
+        key: str,
+        matcher: Literal['xp', 'keyword', 'regex'],
+        pattern: str,
+        title: str,
+        description: str,
+        multi_select: bool = False,
+        min_value: Optional[int] = None,
+        max_value: Optional[int] = None,
+        all_guilds: bool = False,
+    ):
         await interaction.response.defer(ephemeral=True)
 
         if interaction.user.id not in self.bot.whitelist:
             return
 
-        if not interaction.guild.me.guild_permissions.manage_roles or not interaction.guild.me.guild_permissions.administrator:
-            await interaction.followup.send(
-                embed=BotErrorEmbed(description="❌ I don't have the `Manage Roles` permission!"),
-                ephemeral=True
+        guild_id = 0 if all_guilds else interaction.guild.id
+        try:
+            category = RoleCategory(
+                key.lower(), matcher, pattern, title, description,
+                min_value=min_value, max_value=max_value, multi_select=multi_select, guild_id=guild_id,
             )
+        except (ValueError, re.error) as e:
+            await interaction.followup.send(embed=BotErrorEmbed(description=f"❌ Invalid category: {e}"), ephemeral=True)
             return
-
-        # Delete old view if it exists
-        old_view_data = await fetch_view(ViewType.RANK, interaction.guild.id)
-        if old_view_data:
-            old_channel = await interaction.guild.get_channel(old_view_data[3])
-            old_message_id = old_view_data[4]
-            try:
-                old_msg = await old_channel.fetch_message(old_message_id)
-                await old_msg.delete()
-            except discord.NotFound:
-                pass
-
-        # Prepare new roles
-        rank_roles = self.filter_rank_roles(interaction.guild.roles)
-
-        # Create embed
-        rank_title_embed = BotMessageEmbed(
-            title='Ranked Roles',
-            description='Select Your Most Recent Rank'
-        )
-
-        # Send message
-        post = await interaction.channel.send(embed=rank_title_embed)
-        print(post.id)
-
-        view = rdd.RoleViewRanks(
-            guild_id=post.guild.id,
-            msg_id=post.id,
-            bot=self.bot
-        )
-        view.update_roles(rank_roles)
-        await post.edit(view=view)
-
-        # Store in DB
-        await insert_view(
-            view_type=ViewType.RANK,
-            guild_id=post.guild.id,
-            channel_id=post.channel.id,
-            message_id=post.id,
-            bot=self.bot
+        await role_categories.put(category)
+
+        # Role membership is recomputed on next use, and menus already posted are redrawn
+        if all_guilds:
+            role_index.clear()
+            guild_ids = {record.guild_id for record in view_registry.all() if record.view_type == category.key}
+        else:
+            role_index.forget(guild_id)
+            guild_ids = {guild_id} if view_registry.get(category.key, guild_id) else set()
+        for affected in guild_ids:
+            self.refresher.mark(affected)
+
+        await interaction.followup.send(
+            embed=BotConfirmationEmbed(description=f"✅ Saved role category `{category.key}`."),
+            ephemeral=True
         )
 
-        await interaction.followup.send(embed=BotConfirmationEmbed(description='✅ Sent New Dropdown!'))
-
-    @app_commands.command(name='ping-roles', description='Get a drodown of pingable roles to assign/remove')
-    async def ping_dropdown(self, interaction: discord.Interaction):
+    @app_commands.command(name='role-category-remove', description='Remove a role menu category')
+    @app_commands.describe(
+        category='Category to remove',
+        all_guilds='Remove a default every guild uses instead of this guild\'s own category',
+    )
+    @app_commands.autocomplete(category=category_autocomplete)
+    async def role_category_remove(self, interaction: discord.Interaction, category: str, all_guilds: bool = False):
         await interaction.response.defer(ephemeral=True)
 
         if interaction.user.id not in self.bot.whitelist:
             return
 
-        if not interaction.guild.me.guild_permissions.manage_roles or not interaction.guild.me.guild_permissions.administrator:
+        key = category.lower()
+        if all_guilds and any(default.key == key for default in DEFAULT_CATEGORIES):
+            # Built-in defaults are seeded again on every start
             await interaction.followup.send(
-                embed=BotErrorEmbed(description="❌ I don't have the `Manage Roles` permission!"),
+                embed=BotErrorEmbed(description=f"❌ `{key}` is built in, change it with /role-category instead."),
                 ephemeral=True
             )
             return
 
-        # Delete old view if it exists
-        old_view_data = await fetch_view(ViewType.PING, interaction.guild.id)
-        if old_view_data:
-            old_channel = await interaction.guild.get_channel(old_view_data[3])
-            old_message_id = old_view_data[4]
-            try:
-                old_msg = await old_channel.fetch_message(old_message_id)
-                await old_msg.delete()
-            except discord.NotFound:
-                pass
-
-        ping_roles = self.filter_ping_roles(interaction.guild.roles)
-        print('DEBUG'*100)
-        print(ping_roles)
+        guild_id = 0 if all_guilds else interaction.guild.id
+        if not await role_categories.delete(guild_id, key):
+            scope = 'default' if all_guilds else 'server'
+            await interaction.followup.send(embed=BotErrorEmbed(description=f"❌ No {scope} role category `{key}`."), ephemeral=True)
+            return
 
-        ping_title_embed = BotMessageEmbed(title="Pingable Roles", description="Select All Roles You Want Pings For")
+        if all_guilds:
+            role_index.clear()
+            records = [record for record in view_registry.all() if record.view_type == key]
+        else:
+            role_index.forget(guild_id)
+            records = [record for record in [view_registry.get(key, guild_id)] if record]
+
+        # Posted menus are redrawn from the default that takes the removed category's place, if there is one,
+        # otherwise they could only answer that the menu is gone, so they are deleted
+        orphaned = [record for record in records if role_categories.get(record.guild_id, key) is None]
+        await view_registry.remove_many([record.message_id for record in orphaned])
+        for record in orphaned:
+            await self.delete_menu_message(record)
+        for affected in {record.guild_id for record in records} - {record.guild_id for record in orphaned}:
+            self.refresher.mark(affected)
+
+        deleted = f" and deleted {len(orphaned)} of its menus" if orphaned else ''
+        await interaction.followup.send(
+            embed=BotConfirmationEmbed(description=f"✅ Removed role category `{key}`{deleted}."),
+            ephemeral=True
+        )
 
-        post = await interaction.channel.send(embed=ping_title_embed)
-        print(post.id)
+    @app_commands.command(name='role-queue', description='Show role edit queue, reply, loop lag and rate limit stats for this server')
+    async def role_queue(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
 
-        ping_view = rdd.RoleViewPings(
-            guild_id=interaction.guild.id,
-            msg_id=post.id,
-            bot=self.bot
-        )
-        ping_view.update_roles(ping_roles)
-        await post.edit(view=ping_view)
-
-        # Store in DB
-        await insert_view(
-            ViewType.PING,
-            post.guild.id,
-            post.channel.id,
-            post.id,
-            self.bot
-        )
+        if interaction.user.id not in self.bot.whitelist:
+            return
 
-        await interaction.followup.send(embed=BotConfirmationEmbed(description='✅ Sent New Dropdown!'))
+        snapshot = role_mutation_queue.snapshot()
+        stats = snapshot['guilds'].get(interaction.guild.id)
+        replies = reply_stats.as_dict()
+        lag = loop_lag.as_dict()
+        fields = {
+            'Waiting (all servers)': snapshot['depth'],
+            'Running (all servers)': snapshot['running'],
+            '429s here / total': f"{self.bot.rate_limits.by_guild[interaction.guild.id]} / {self.bot.rate_limits.total}",
+            'Global rate limits': self.bot.rate_limits.global_hits,
+            # Replies are direct when the role change beats ROLE_REPLY_BUDGET, otherwise deferred
+            'Replies direct / deferred': f"{replies['direct']} / {replies['deferred']}",
+            'Role change p50 / p90 / p99': f"{replies['p50'] * 1000:.0f} / {replies['p90'] * 1000:.0f} / {replies['p99'] * 1000:.0f} ms",
+            # Every interaction waits behind a blocked loop, see utils/looplag.py
+            'Loop lag p50 / p99 / max': f"{lag['p50'] * 1000:.0f} / {lag['p99'] * 1000:.0f} / {lag['max'] * 1000:.0f} ms ({lag['stalls']} stalls)",
+        }
+        if stats:
+            fields.update({
+                'Waiting here': stats['depth'],
+                'Submitted / completed / failed': f"{stats['submitted']} / {stats['completed']} / {stats['failed']}",
+                'Rejected (queue full)': stats['rejected'],
+                'Wait avg / max': f"{stats['wait_avg'] * 1000:.0f} ms / {stats['wait_max'] * 1000:.0f} ms",
+                'Deepest queue': stats['depth_max'],
+            })
+        await interaction.followup.send(embed=createEmbedFields('Role Edit Queue', **fields), ephemeral=True)
 
 async def setup(bot):
     await bot.add_cog(Roles(bot))
@@ -1,9 +1,19 @@
-import aiosqlite
 from enum import Enum
+from functools import wraps
+from os import getenv
 from typing import Optional, List, Tuple, Union
+from db.postgre_connection import get_db_credentials
+from db.postgre_store import PostgresViewStore
+from db.sqlite_store import SQLiteViewStore
+from db.view_store import ViewStore
 from utils.loggingsetup import getlog
+from utils.metrics import db_query_seconds
 
-DB_NAME = "views.db"
+# WAL mode keeps -wal/-shm files beside the database, so mount its whole directory in containers
+DB_NAME = getenv("VIEWS_DB_PATH") or "views.db"
+
+# Process-wide backend, picked by configure_store() in Bot.setup_hook and closed in Bot.close
+store: ViewStore = SQLiteViewStore(DB_NAME)
 
 class ViewType(Enum):
     PING = 'ping'
@@ -11,51 +21,58 @@ class ViewType(Enum):
     NA = "na"
     JP = "jp"
 
+def configure_store(pool=None) -> ViewStore:
+    """Keep views in Postgres when the POSTGRE_* variables are all set and a pool exists, otherwise in SQLite."""
+    global store
+    if pool is not None and all(get_db_credentials().values()):
+        store = PostgresViewStore(pool)
+    else:
+        store = SQLiteViewStore(DB_NAME)
+    getlog().info(f"Using the {store.name} view store.")
+    return store
+
+def use_store(new_store: ViewStore) -> None:
+    global store
+    store = new_store
+
+async def open_db() -> None:
+    await store.open()
+
+async def close_db() -> None:
+    await store.close()
+
 async def setup_db() -> None:
     getlog().info("Setting up the database...")
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS views (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id INTEGER NOT NULL,
-                channel_id INTEGER NOT NULL,
-                message_id INTEGER NOT NULL,
-                view_type TEXT NOT NULL,
-                UNIQUE (guild_id, view_type)
-            )
-        """)
-        getlog().info("Created 'views' table with UNIQUE constraint if it didn't exist.")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_views_guild_id ON views(guild_id)")
-        getlog().info("Ensured index on guild_id.")
-        await db.commit()
+    await store.setup()
     getlog().info("Database setup complete.")
 
 
+def timed(func):
+    """Records the call's duration in bot_db_query_seconds under the function's name."""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        with db_query_seconds.time(func.__name__):
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+@timed
 async def fetch_view(view_type: ViewType, guild_id: int) -> Optional[Tuple[int, int, int, int]]:
-    getlog().info(f"Fetching view for guild_id={guild_id} and view_type={view_type.value}...")
-    async with aiosqlite.connect(DB_NAME) as db:
-        async with db.execute("""
-            SELECT id, guild_id, channel_id, message_id
-            FROM views
-            WHERE guild_id = ? AND view_type = ?
-        """, (guild_id, view_type.value)) as cursor:
-            row = await cursor.fetchone()
-    if row:
-        getlog().info(f"Found view in DB: {row}")
-    else:
-        getlog().info("No view found.")
+    # Hot path: lazy DEBUG records cost nothing unless LOG_LEVEL=DEBUG
+    getlog().debug("Fetching view for guild_id=%s and view_type=%s...", guild_id, view_type.value)
+    row = await store.fetch_view(view_type.value, guild_id)
+    getlog().debug("Found view in DB: %s", row)
     return row
 
-async def fetch_all_views() -> List[Tuple[int, int, str, int]]:
+@timed
+async def fetch_all_views() -> List[Tuple[int, int, str, int, Optional[str]]]:
     getlog().info("Fetching all views from the database...")
-    async with aiosqlite.connect(DB_NAME) as db:
-        async with db.execute("SELECT guild_id, channel_id, view_type, message_id FROM views") as cursor:
-            rows = await cursor.fetchall()
+    rows = await store.fetch_all_views()
     getlog().info(f"Fetched {len(rows)} views.")
     return rows
 
 async def insert_view(view_type: ViewType, guild_id: int, channel_id: int, message_id: int, bot) -> None:
-    getlog().info(f"Inserting/updating view: guild_id={guild_id}, view_type={view_type.value}, channel_id={channel_id}, message_id={message_id}")
+    getlog().info("Inserting/updating view: guild_id=%s, view_type=%s, channel_id=%s, message_id=%s", guild_id, view_type.value, channel_id, message_id)
 
     old = await fetch_view(view_type, guild_id)
     if old:
@@ -75,59 +92,76 @@ async def insert_view(view_type: ViewType, guild_id: int, channel_id: int, messa
         except Exception as e:
             getlog().error(f"Exception while deleting old message: {e}")
 
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("""
-            INSERT INTO views (guild_id, channel_id, message_id, view_type)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(guild_id, view_type) DO UPDATE SET
-                channel_id = excluded.channel_id,
-                message_id = excluded.message_id
-        """, (guild_id, channel_id, message_id, view_type.value))
-        await db.commit()
-    getlog().info("View inserted/updated in DB.")
+    await upsert_view(view_type, guild_id, channel_id, message_id)
 
+@timed
+async def upsert_view(view_type: ViewType, guild_id: int, channel_id: int, message_id: int, fingerprint: Optional[str] = None) -> None:
+    await store.apply_view_changes([(guild_id, channel_id, message_id, view_type.value, fingerprint)], [])
+    getlog().debug("View inserted/updated in DB.")
+
+@timed
+async def apply_view_changes(upserts: List[Tuple[int, int, int, str, Optional[str]]], deletes: List[Tuple[int, str]]) -> None:
+    """Write a batch of (guild_id, channel_id, message_id, view_type, fingerprint) upserts and
+    (guild_id, view_type) deletes in one transaction, so the whole batch costs one commit."""
+    await store.apply_view_changes(upserts, deletes)
+    getlog().info("Committed %s view upserts and %s view deletes.", len(upserts), len(deletes))
+
+@timed
 async def delete_view(message_id: int, guild_id: int) -> None:
-    getlog().info(f"Deleting view from DB: guild_id={guild_id}, message_id={message_id}")
-    async with aiosqlite.connect(DB_NAME) as db:
-        res = await db.execute("DELETE FROM views WHERE message_id = ? AND guild_id = ?", (message_id, guild_id))
-        await db.commit()
-    getlog().info(f"{res}")
+    await store.delete_view(message_id, guild_id)
+    getlog().info("Deleted view from DB: guild_id=%s, message_id=%s", guild_id, message_id)
 
+@timed
 async def custom_query(sql_stmt: str, *params) -> Union[None, List[Tuple]]:
-    getlog().info(f"Running custom query: {sql_stmt} with params: {params}")
-    async with aiosqlite.connect(DB_NAME) as db:
-        async with db.execute(sql_stmt, params) as cursor:
-            if sql_stmt.strip().lower().startswith("select"):
-                rows = await cursor.fetchall()
-                getlog().info(f"Custom select query returned {len(rows)} rows.")
-                return rows
-            else:
-                await db.commit()
-                getlog().info("Custom non-select query executed and committed.")
-                return None
+    getlog().debug("Running custom query: %s with params: %s", sql_stmt, params)
+    rows = await store.custom_query(sql_stmt, *params)
+    if rows is not None:
+        getlog().debug("Custom select query returned %s rows.", len(rows))
+    else:
+        getlog().debug("Custom non-select query executed and committed.")
+    return rows
 
-async def print_all_views() -> None:
-    getlog().info("Printing all views from the database:")
-    async with aiosqlite.connect(DB_NAME) as db:
-        async with db.execute("SELECT * FROM views") as cursor:
-            rows = await cursor.fetchall()
+@timed
+async def fetch_role_categories() -> List[Tuple]:
+    getlog().info("Fetching role category definitions...")
+    rows = await store.fetch_role_categories()
+    getlog().info(f"Fetched {len(rows)} role categories.")
+    return rows
 
-        if not rows:
-            getlog().info("Database is empty.")
-            print("Database is empty.")
-            return
+@timed
+async def upsert_role_categories(rows: List[Tuple], replace: bool = True) -> None:
+    getlog().info(f"Storing {len(rows)} role categories (replace={replace})...")
+    await store.upsert_role_categories(rows, replace)
 
-        async with db.execute("PRAGMA table_info(views)") as col_cursor:
-            columns_info = await col_cursor.fetchall()
+@timed
+async def delete_role_category(guild_id: int, key: str) -> None:
+    getlog().info(f"Deleting role category {key} for guild_id={guild_id}")
+    await store.delete_role_category(guild_id, key)
 
-        columns = [col[1] for col in columns_info]
+@timed
+async def get_state(key: str) -> Optional[str]:
+    return await store.get_state(key)
 
-        header = " | ".join(columns)
-        getlog().info(f"Columns: {header}")
-        print(header)
-        print("-" * 50)
+@timed
+async def set_state(key: str, value: str) -> None:
+    getlog().info(f"Storing bot state {key}")
+    await store.set_state(key, value)
 
-        for row in rows:
-            line = " | ".join(str(item) for item in row)
-            getlog().info(f"Row: {line}")
-            print(line)
+async def print_all_views() -> None:
+    getlog().info("Printing all views from the database:")
+    columns, rows = await store.dump_views()
+
+    if not rows:
+        getlog().info("Database is empty.")
+        print("Database is empty.")
+        return
+
+    header = " | ".join(columns)
+    getlog().info(f"Columns: {header}")
+    print(header)
+    print("-" * 50)
+
+    for row in rows:
+        line = " | ".join(str(item) for item in row)
+        getlog().info(f"Row: {line}")
+        print(line)
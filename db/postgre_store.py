@@ -0,0 +1,152 @@
+import asyncpg
+from typing import List, Optional, Sequence, Tuple, Union
+from db.view_store import ViewStore, ViewRow, ViewKey, CategoryRow
+
+UPSERT_VIEW = """
+    INSERT INTO views (guild_id, channel_id, message_id, view_type, fingerprint)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (guild_id, view_type) DO UPDATE SET
+        channel_id = EXCLUDED.channel_id,
+        message_id = EXCLUDED.message_id,
+        fingerprint = EXCLUDED.fingerprint
+"""
+
+CATEGORY_COLUMNS = "guild_id, key, matcher, pattern, min_value, max_value, multi_select, title, description, placeholder"
+UPSERT_CATEGORY = f"""
+    INSERT INTO role_categories ({CATEGORY_COLUMNS})
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    ON CONFLICT (guild_id, key) DO UPDATE SET
+        matcher = EXCLUDED.matcher,
+        pattern = EXCLUDED.pattern,
+        min_value = EXCLUDED.min_value,
+        max_value = EXCLUDED.max_value,
+        multi_select = EXCLUDED.multi_select,
+        title = EXCLUDED.title,
+        description = EXCLUDED.description,
+        placeholder = EXCLUDED.placeholder
+"""
+INSERT_CATEGORY_IF_MISSING = f"""
+    INSERT INTO role_categories ({CATEGORY_COLUMNS})
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    ON CONFLICT (guild_id, key) DO NOTHING
+"""
+
+
+class PostgresViewStore(ViewStore):
+    """Views kept in Postgres through the asyncpg pool created in run_bot.py.
+
+    The pool belongs to run_bot.py, so close() leaves it open. asyncpg prepares
+    every statement once per pooled connection and reuses it from its
+    statement cache, and batches go through executemany inside one
+    transaction.
+    """
+
+    name = 'postgres'
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+
+    async def open(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    async def setup(self) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS views (
+                    id BIGSERIAL PRIMARY KEY,
+                    guild_id BIGINT NOT NULL,
+                    channel_id BIGINT NOT NULL,
+                    message_id BIGINT NOT NULL,
+                    view_type TEXT NOT NULL,
+                    fingerprint TEXT,
+                    UNIQUE (guild_id, view_type)
+                )
+            """)
+            # Tables created before role fingerprints existed get the column added in place
+            await conn.execute("ALTER TABLE views ADD COLUMN IF NOT EXISTS fingerprint TEXT")
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_views_guild_id ON views(guild_id)")
+            # guild_id 0 holds the defaults every guild starts with
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS role_categories (
+                    guild_id BIGINT NOT NULL DEFAULT 0,
+                    key TEXT NOT NULL,
+                    matcher TEXT NOT NULL,
+                    pattern TEXT NOT NULL,
+                    min_value INTEGER,
+                    max_value INTEGER,
+                    multi_select BOOLEAN NOT NULL DEFAULT FALSE,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    placeholder TEXT,
+                    PRIMARY KEY (guild_id, key)
+                )
+            """)
+            await conn.execute("CREATE TABLE IF NOT EXISTS bot_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    async def fetch_view(self, view_type: str, guild_id: int) -> Optional[Tuple[int, int, int, int]]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT id, guild_id, channel_id, message_id
+                FROM views
+                WHERE guild_id = $1 AND view_type = $2
+            """, guild_id, view_type)
+        return tuple(row) if row else None
+
+    async def fetch_all_views(self) -> List[Tuple[int, int, str, int, Optional[str]]]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT guild_id, channel_id, view_type, message_id, fingerprint FROM views")
+        return [tuple(row) for row in rows]
+
+    async def apply_view_changes(self, upserts: Sequence[ViewRow], deletes: Sequence[ViewKey]) -> None:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if deletes:
+                    await conn.executemany("DELETE FROM views WHERE guild_id = $1 AND view_type = $2", deletes)
+                if upserts:
+                    await conn.executemany(UPSERT_VIEW, upserts)
+
+    async def delete_view(self, message_id: int, guild_id: int) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM views WHERE message_id = $1 AND guild_id = $2", message_id, guild_id)
+
+    async def custom_query(self, sql_stmt: str, *params) -> Union[None, List[Tuple]]:
+        async with self.pool.acquire() as conn:
+            if sql_stmt.strip().lower().startswith("select"):
+                return [tuple(row) for row in await conn.fetch(sql_stmt, *params)]
+            await conn.execute(sql_stmt, *params)
+            return None
+
+    async def fetch_role_categories(self) -> List[CategoryRow]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(f"SELECT {CATEGORY_COLUMNS} FROM role_categories")
+        return [tuple(row) for row in rows]
+
+    async def upsert_role_categories(self, rows: Sequence[CategoryRow], replace: bool = True) -> None:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(UPSERT_CATEGORY if replace else INSERT_CATEGORY_IF_MISSING, rows)
+
+    async def delete_role_category(self, guild_id: int, key: str) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM role_categories WHERE guild_id = $1 AND key = $2", guild_id, key)
+
+    async def get_state(self, key: str) -> Optional[str]:
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval("SELECT value FROM bot_state WHERE key = $1", key)
+
+    async def set_state(self, key: str, value: str) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO bot_state (key, value) VALUES ($1, $2)
+                ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
+            """, key, value)
+
+    async def dump_views(self) -> Tuple[List[str], List[Tuple]]:
+        async with self.pool.acquire() as conn:
+            statement = await conn.prepare("SELECT * FROM views")
+            columns = [attr.name for attr in statement.get_attributes()]
+            rows = [tuple(row) for row in await statement.fetch()]
+        return columns, rows
@@ -0,0 +1,59 @@
+import asyncio
+import aiosqlite
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from utils.loggingsetup import getlog
+
+
+class SQLiteConnectionManager:
+    """Owns one long-lived aiosqlite connection for the whole process.
+
+    aiosqlite runs every connection on its own worker thread, so opening a
+    connection per query costs a thread spawn plus a file open. Keeping a
+    single connection also keeps sqlite3's prepared statement cache warm,
+    since statements are cached per connection and keyed by their SQL text.
+    """
+
+    def __init__(self, database: str, busy_timeout_ms: int = 5000, cached_statements: int = 128) -> None:
+        self.database = database
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    async def open(self) -> aiosqlite.Connection:
+        if self._conn is not None:
+            return self._conn
+
+        getlog().info(f"Opening SQLite connection to {self.database}...")
+        conn = await aiosqlite.connect(self.database, cached_statements=self.cached_statements)
+        # WAL lets readers run while a write is in progress and turns most commits into an append
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        # NORMAL is durable across application crashes when running in WAL mode
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn = conn
+        self._lock = asyncio.Lock()
+        getlog().info(f"SQLite connection opened (WAL, busy_timeout={self.busy_timeout_ms}ms).")
+        return conn
+
+    async def close(self) -> None:
+        if self._conn is None:
+            return
+        conn = self._conn
+        async with self._lock:
+            self._conn = None
+            await conn.close()
+        self._lock = None
+        getlog().info("SQLite connection closed.")
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosqlite.Connection]:
+        # One coroutine at a time so a commit never includes another caller's half-finished work
+        conn = await self.open()
+        async with self._lock:
+            yield conn
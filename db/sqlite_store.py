@@ -0,0 +1,166 @@
+from typing import List, Optional, Sequence, Tuple, Union
+from db.sqlite_connection import SQLiteConnectionManager
+from db.view_store import ViewStore, ViewRow, ViewKey, CategoryRow
+
+UPSERT_VIEW = """
+    INSERT INTO views (guild_id, channel_id, message_id, view_type, fingerprint)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(guild_id, view_type) DO UPDATE SET
+        channel_id = excluded.channel_id,
+        message_id = excluded.message_id,
+        fingerprint = excluded.fingerprint
+"""
+
+CATEGORY_COLUMNS = "guild_id, key, matcher, pattern, min_value, max_value, multi_select, title, description, placeholder"
+UPSERT_CATEGORY = f"""
+    INSERT INTO role_categories ({CATEGORY_COLUMNS})
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(guild_id, key) DO UPDATE SET
+        matcher = excluded.matcher,
+        pattern = excluded.pattern,
+        min_value = excluded.min_value,
+        max_value = excluded.max_value,
+        multi_select = excluded.multi_select,
+        title = excluded.title,
+        description = excluded.description,
+        placeholder = excluded.placeholder
+"""
+INSERT_CATEGORY_IF_MISSING = f"""
+    INSERT INTO role_categories ({CATEGORY_COLUMNS})
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(guild_id, key) DO NOTHING
+"""
+
+
+class SQLiteViewStore(ViewStore):
+    """Views kept in a local SQLite file through one shared aiosqlite connection."""
+
+    name = 'sqlite'
+
+    def __init__(self, database: str) -> None:
+        self.manager = SQLiteConnectionManager(database)
+
+    async def open(self) -> None:
+        await self.manager.open()
+
+    async def close(self) -> None:
+        await self.manager.close()
+
+    async def setup(self) -> None:
+        async with self.manager.connection() as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS views (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    message_id INTEGER NOT NULL,
+                    view_type TEXT NOT NULL,
+                    fingerprint TEXT,
+                    UNIQUE (guild_id, view_type)
+                )
+            """)
+            # Tables created before role fingerprints existed get the column added in place
+            async with db.execute("PRAGMA table_info(views)") as cursor:
+                columns = {col[1] for col in await cursor.fetchall()}
+            if 'fingerprint' not in columns:
+                await db.execute("ALTER TABLE views ADD COLUMN fingerprint TEXT")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_views_guild_id ON views(guild_id)")
+            # guild_id 0 holds the defaults every guild starts with
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS role_categories (
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    key TEXT NOT NULL,
+                    matcher TEXT NOT NULL,
+                    pattern TEXT NOT NULL,
+                    min_value INTEGER,
+                    max_value INTEGER,
+                    multi_select INTEGER NOT NULL DEFAULT 0,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    placeholder TEXT,
+                    PRIMARY KEY (guild_id, key)
+                )
+            """)
+            await db.execute("CREATE TABLE IF NOT EXISTS bot_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            await db.commit()
+
+    async def fetch_view(self, view_type: str, guild_id: int) -> Optional[Tuple[int, int, int, int]]:
+        async with self.manager.connection() as db:
+            async with db.execute("""
+                SELECT id, guild_id, channel_id, message_id
+                FROM views
+                WHERE guild_id = ? AND view_type = ?
+            """, (guild_id, view_type)) as cursor:
+                return await cursor.fetchone()
+
+    async def fetch_all_views(self) -> List[Tuple[int, int, str, int, Optional[str]]]:
+        async with self.manager.connection() as db:
+            async with db.execute("SELECT guild_id, channel_id, view_type, message_id, fingerprint FROM views") as cursor:
+                return list(await cursor.fetchall())
+
+    async def apply_view_changes(self, upserts: Sequence[ViewRow], deletes: Sequence[ViewKey]) -> None:
+        async with self.manager.connection() as db:
+            try:
+                if deletes:
+                    await db.executemany("DELETE FROM views WHERE guild_id = ? AND view_type = ?", deletes)
+                if upserts:
+                    await db.executemany(UPSERT_VIEW, upserts)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+    async def delete_view(self, message_id: int, guild_id: int) -> None:
+        async with self.manager.connection() as db:
+            await db.execute("DELETE FROM views WHERE message_id = ? AND guild_id = ?", (message_id, guild_id))
+            await db.commit()
+
+    async def custom_query(self, sql_stmt: str, *params) -> Union[None, List[Tuple]]:
+        async with self.manager.connection() as db:
+            async with db.execute(sql_stmt, params) as cursor:
+                if sql_stmt.strip().lower().startswith("select"):
+                    return list(await cursor.fetchall())
+                await db.commit()
+                return None
+
+    async def fetch_role_categories(self) -> List[CategoryRow]:
+        async with self.manager.connection() as db:
+            async with db.execute(f"SELECT {CATEGORY_COLUMNS} FROM role_categories") as cursor:
+                rows = await cursor.fetchall()
+        # SQLite has no boolean type, multi_select comes back as 0/1
+        return [(*row[:6], bool(row[6]), *row[7:]) for row in rows]
+
+    async def upsert_role_categories(self, rows: Sequence[CategoryRow], replace: bool = True) -> None:
+        async with self.manager.connection() as db:
+            try:
+                await db.executemany(UPSERT_CATEGORY if replace else INSERT_CATEGORY_IF_MISSING, rows)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+    async def delete_role_category(self, guild_id: int, key: str) -> None:
+        async with self.manager.connection() as db:
+            await db.execute("DELETE FROM role_categories WHERE guild_id = ? AND key = ?", (guild_id, key))
+            await db.commit()
+
+    async def get_state(self, key: str) -> Optional[str]:
+        async with self.manager.connection() as db:
+            async with db.execute("SELECT value FROM bot_state WHERE key = ?", (key,)) as cursor:
+                row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def set_state(self, key: str, value: str) -> None:
+        async with self.manager.connection() as db:
+            await db.execute("""
+                INSERT INTO bot_state (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (key, value))
+            await db.commit()
+
+    async def dump_views(self) -> Tuple[List[str], List[Tuple]]:
+        async with self.manager.connection() as db:
+            async with db.execute("SELECT * FROM views") as cursor:
+                rows = list(await cursor.fetchall())
+                columns = [col[0] for col in cursor.description]
+        return columns, rows
@@ -0,0 +1,120 @@
+from typing import Dict, List, NamedTuple, Optional, Set, Union
+from db.persistent_db import ViewType, fetch_all_views
+from db.write_behind import ViewWriteQueue, view_write_queue
+from utils.loggingsetup import getlog
+
+
+class ViewRecord(NamedTuple):
+    # Same column order as fetch_all_views() so rows can be unpacked straight into records
+    guild_id: int
+    channel_id: int
+    view_type: str
+    message_id: int
+    # Hash of the roles rendered in the menu, None for rows stored before fingerprints existed
+    fingerprint: Optional[str] = None
+
+
+def _key(view_type: Union[ViewType, str]) -> str:
+    # Menus are stored under their role category key; the built-in ones match the ViewType values
+    return view_type.value if isinstance(view_type, ViewType) else view_type
+
+
+class ViewRegistry:
+    """In-memory copy of the views table.
+
+    Loaded once at startup, then reads are served from dict indexes by guild and by message.
+    Writes update the indexes immediately and are handed to a ViewWriteQueue,
+    which batches them into the database.
+    """
+
+    def __init__(self, writer: ViewWriteQueue) -> None:
+        self.writer = writer
+        # guild_id -> view_type -> record, so both single lookups and per-guild listings are dict reads
+        self._by_guild: Dict[int, Dict[str, ViewRecord]] = {}
+        self._by_message: Dict[int, ViewRecord] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._by_message)
+
+    async def load(self) -> None:
+        # Anything still queued would be missing from the rows read back
+        await self.writer.flush()
+        rows = await fetch_all_views()
+        self._by_guild.clear()
+        self._by_message.clear()
+        for row in rows:
+            self._index(ViewRecord(*row))
+        self.loaded = True
+        getlog().info(f"View registry loaded {len(self)} views.")
+
+    def get(self, view_type: Union[ViewType, str], guild_id: int) -> Optional[ViewRecord]:
+        return self._by_guild.get(guild_id, {}).get(_key(view_type))
+
+    def get_by_message(self, message_id: int) -> Optional[ViewRecord]:
+        return self._by_message.get(message_id)
+
+    def is_tracked(self, message_id: int) -> bool:
+        return message_id in self._by_message
+
+    def tracked(self, message_ids) -> Set[int]:
+        """The subset of message_ids that are tracked menus."""
+        return self._by_message.keys() & message_ids
+
+    def all(self) -> List[ViewRecord]:
+        return list(self._by_message.values())
+
+    def for_guild(self, guild_id: int) -> List[ViewRecord]:
+        return list(self._by_guild.get(guild_id, {}).values())
+
+    async def put(self, view_type: Union[ViewType, str], guild_id: int, channel_id: int, message_id: int, fingerprint: Optional[str] = None) -> Optional[ViewRecord]:
+        """Store the view for (guild_id, view_type) and return the record it replaced, if any."""
+        view_type = _key(view_type)
+        old = self._by_guild.get(guild_id, {}).get(view_type)
+        if old:
+            self._by_message.pop(old.message_id, None)
+        self._index(ViewRecord(guild_id, channel_id, view_type, message_id, fingerprint))
+        await self.writer.upsert(guild_id, channel_id, message_id, view_type, fingerprint)
+        return old
+
+    async def set_fingerprint(self, message_id: int, fingerprint: str) -> None:
+        record = self._by_message.get(message_id)
+        if record is None or record.fingerprint == fingerprint:
+            return
+        record = record._replace(fingerprint=fingerprint)
+        self._index(record)
+        await self.writer.upsert(record.guild_id, record.channel_id, record.message_id, record.view_type, fingerprint)
+
+    async def remove(self, message_id: int) -> Optional[ViewRecord]:
+        """Forget the view posted as message_id. Untracked messages never reach the database."""
+        record = self._by_message.get(message_id)
+        if record is None:
+            return None
+        self._by_message.pop(message_id, None)
+        guild_views = self._by_guild.get(record.guild_id, {})
+        guild_views.pop(record.view_type, None)
+        if not guild_views:
+            self._by_guild.pop(record.guild_id, None)
+        await self.writer.delete(record.guild_id, record.view_type)
+        return record
+
+    async def remove_many(self, message_ids) -> List[ViewRecord]:
+        """Forget several views at once; their rows are deleted in a single batch."""
+        records = []
+        for message_id in self.tracked(message_ids):
+            record = self._by_message.pop(message_id)
+            guild_views = self._by_guild.get(record.guild_id, {})
+            guild_views.pop(record.view_type, None)
+            if not guild_views:
+                self._by_guild.pop(record.guild_id, None)
+            records.append(record)
+        if records:
+            await self.writer.delete_many((record.guild_id, record.view_type) for record in records)
+        return records
+
+    def _index(self, record: ViewRecord) -> None:
+        self._by_guild.setdefault(record.guild_id, {})[record.view_type] = record
+        self._by_message[record.message_id] = record
+
+
+view_registry = ViewRegistry(view_write_queue)
@@ -0,0 +1,81 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence, Tuple, Union
+
+ViewRow = Tuple[int, int, int, str, Optional[str]]  # (guild_id, channel_id, message_id, view_type, fingerprint)
+ViewKey = Tuple[int, str]  # (guild_id, view_type)
+# (guild_id, key, matcher, pattern, min_value, max_value, multi_select, title, description, placeholder)
+CategoryRow = Tuple[int, str, str, str, Optional[int], Optional[int], bool, str, str, Optional[str]]
+
+
+class ViewStore(ABC):
+    """Storage backend behind the functions in db/persistent_db.py.
+
+    view_type is always passed as the plain string value of ViewType so the
+    backends do not depend on the enum. A backend missing any method fails
+    when it is created rather than on the first call to that method.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    async def open(self) -> None:
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+    @abstractmethod
+    async def setup(self) -> None:
+        ...
+
+    @abstractmethod
+    async def fetch_view(self, view_type: str, guild_id: int) -> Optional[Tuple[int, int, int, int]]:
+        """Return (id, guild_id, channel_id, message_id) for one view, or None."""
+        ...
+
+    @abstractmethod
+    async def fetch_all_views(self) -> List[Tuple[int, int, str, int, Optional[str]]]:
+        """Return every view as (guild_id, channel_id, view_type, message_id, fingerprint)."""
+        ...
+
+    @abstractmethod
+    async def apply_view_changes(self, upserts: Sequence[ViewRow], deletes: Sequence[ViewKey]) -> None:
+        """Apply a batch of upserts and (guild_id, view_type) deletes in one transaction."""
+        ...
+
+    @abstractmethod
+    async def delete_view(self, message_id: int, guild_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def custom_query(self, sql_stmt: str, *params) -> Union[None, List[Tuple]]:
+        """Run raw SQL in the backend's own dialect (? placeholders for SQLite, $1 for Postgres)."""
+        ...
+
+    @abstractmethod
+    async def fetch_role_categories(self) -> List[CategoryRow]:
+        ...
+
+    @abstractmethod
+    async def upsert_role_categories(self, rows: Sequence[CategoryRow], replace: bool = True) -> None:
+        """Store category definitions. With replace=False existing (guild_id, key) rows are kept as they are."""
+        ...
+
+    @abstractmethod
+    async def delete_role_category(self, guild_id: int, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def get_state(self, key: str) -> Optional[str]:
+        """Small bot-wide values kept across restarts, such as the last synced command tree hash."""
+        ...
+
+    @abstractmethod
+    async def set_state(self, key: str, value: str) -> None:
+        ...
+
+    @abstractmethod
+    async def dump_views(self) -> Tuple[List[str], List[Tuple]]:
+        """Return (column names, rows) for the whole views table."""
+        ...
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Dict, Iterable, Optional
+from db.persistent_db import apply_view_changes
+from db.view_store import ViewKey, ViewRow
+from utils.loggingsetup import getlog
+
+
+class ViewWriteQueue:
+    """Write-behind buffer for view mutations.
+
+    Each (guild_id, view_type) key only keeps its latest state: a row to
+    upsert, or None for a delete. Later writes to the same key replace
+    earlier ones, so a burst of changes collapses into at most one
+    statement per key and the whole batch is committed in one transaction.
+    The batch is flushed once max_pending keys are dirty, flush_interval
+    seconds after the first write, and on close().
+    """
+
+    def __init__(self, max_pending: int = 100, flush_interval: float = 2.0) -> None:
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.flush_count = 0
+        self._pending: Dict[ViewKey, Optional[ViewRow]] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def upsert(self, guild_id: int, channel_id: int, message_id: int, view_type: str, fingerprint: Optional[str] = None) -> None:
+        await self._submit((guild_id, view_type), (guild_id, channel_id, message_id, view_type, fingerprint))
+
+    async def delete(self, guild_id: int, view_type: str) -> None:
+        await self._submit((guild_id, view_type), None)
+
+    async def delete_many(self, keys: Iterable[ViewKey]) -> None:
+        # Bulk removals are written right away, together with anything else pending, in one batch
+        for key in keys:
+            self._pending[key] = None
+        await self.flush()
+
+    async def _submit(self, key: ViewKey, row: Optional[ViewRow]) -> None:
+        self._pending[key] = row
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+        elif self._timer is None and not self._closed:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            getlog().error(f"Timed view flush failed, will retry: {e}")
+
+    async def flush(self) -> None:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            upserts = [row for row in batch.values() if row is not None]
+            deletes = [key for key, row in batch.items() if row is None]
+            try:
+                await apply_view_changes(upserts, deletes)
+            except Exception:
+                # Put the batch back unless a newer write for the same key arrived meanwhile
+                for key, row in batch.items():
+                    self._pending.setdefault(key, row)
+                if self._timer is None and not self._closed:
+                    self._timer = asyncio.create_task(self._flush_later())
+                raise
+            self.flush_count += 1
+
+    async def close(self) -> None:
+        # No retry may be scheduled on a loop that is shutting down, and a failed flush must not stop the shutdown
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            getlog().error(f"Final view flush failed, {len(self._pending)} view changes were not saved: {e}")
+
+
+# Process-wide queue, flushed for the last time in Bot.close before the connection closes
+view_write_queue = ViewWriteQueue()
@@ -1,14 +1,23 @@
+import time
+STARTED = time.perf_counter()  # before every other import, so the startup timeline includes them
+
+from dotenv import load_dotenv
+# Before the bot's modules are imported: logging, the views database path, the role queue, the reply
+# budget and the loop lag monitor all read their settings from the environment at import time
+load_dotenv()
+
 import asyncio
 import botclient
 import discord
 import asyncpg
 import db.postgre_connection
+from utils.cacheprofile import get_cache_profile
 from utils.loggingsetup import getlog
-from dotenv import load_dotenv
+from utils.startup import StartupTimeline
 from os import getenv
+IMPORTED = time.perf_counter()
 
 
-load_dotenv()
 TOKEN = getenv("DISCORD_BOT_TOKEN")
 
 if not TOKEN:
@@ -21,28 +30,38 @@ async def main() -> None:
     # Setup Discord Bot Client
     intents: discord.Intents = discord.Intents.default()
     intents.members = True
-    discord_bot = botclient.Bot(command_prefix='}', intents=intents, help_command=None)
+    # CACHE_PROFILE picks how much member and message state is kept, see utils/cacheprofile.py
+    cache_profile = get_cache_profile()
+    timeline = StartupTimeline(origin=STARTED)
+    timeline.record('imports', STARTED, IMPORTED)
+    discord_bot = botclient.Bot(
+        command_prefix='}',
+        help_command=None,
+        cache_profile=cache_profile,
+        timeline=timeline,
+        **cache_profile.client_options(intents)
+    )
 
     # Setup Postgre Database
-    db_creds = list(db.postgre_connection.get_db_credentials().values())
+    db_creds = db.postgre_connection.get_db_credentials()
 
-    if all(db_creds):
+    if all(db_creds.values()):
         # Data Source Name
         POSTGRE_DSN = f'postgres://{db_creds['DB_USER']}:{db_creds['DB_PASS']}@{db_creds['DB_HOST']}:{db_creds['DB_PORT']}/{db_creds['DB_NAME']}'
 
         # Establish Database Pool Connection
         async with asyncpg.create_pool(dsn=POSTGRE_DSN) as pool:
             discord_bot.db_pool = pool
+            async with pool.acquire() as conn:
+                version = await conn.fetchval('SELECT version();')
+            version_msg = f'Connected to {db_creds['DB_NAME']} on Postgre Version: {version}'
+            getlog().info(version_msg)
+            print(version_msg)
 
-            # Start Discord Bot
+            # Start Discord Bot (views are stored in this pool, see db/persistent_db.configure_store)
             try:
                 async with discord_bot:
                     await discord_bot.start(TOKEN)
-                    conn = await discord_bot.db_pool.acquire()
-                    version = conn.fetchval('SELECT version();')
-                    version_msg = f'Connected to {db_creds['DB_NAME']} on Postgre Version: {version}'
-                    getlog().info(version_msg)
-                    print(version_msg)
             except Exception as error:
                 print(error)
                 getlog().error(error)
@@ -0,0 +1,64 @@
+from os import getenv
+from typing import NamedTuple, Optional
+import discord
+
+
+class CacheProfile(NamedTuple):
+    """How much of the gateway state discord.py keeps in memory.
+
+    - full: every member is downloaded at startup and cached, 1000 messages cached (discord.py defaults)
+    - lean: no startup chunking, only the bot's own member cached, 100 messages cached
+    - minimal: like lean with no message cache at all
+
+    Role menus only need the members that click them, and those come with the
+    interaction, so lean and minimal lose nothing the bot uses today. A feature
+    that needs a guild's full member list has to request it with guild.chunk().
+    """
+    name: str
+    chunk_guilds_at_startup: bool
+    cache_members: bool
+    max_messages: Optional[int]
+
+    def client_options(self, intents: discord.Intents) -> dict:
+        return {
+            'intents': intents,
+            'chunk_guilds_at_startup': self.chunk_guilds_at_startup,
+            'member_cache_flags': discord.MemberCacheFlags.from_intents(intents) if self.cache_members else discord.MemberCacheFlags.none(),
+            'max_messages': self.max_messages,
+        }
+
+
+PROFILES = {
+    'full': CacheProfile('full', chunk_guilds_at_startup=True, cache_members=True, max_messages=1000),
+    'lean': CacheProfile('lean', chunk_guilds_at_startup=False, cache_members=False, max_messages=100),
+    'minimal': CacheProfile('minimal', chunk_guilds_at_startup=False, cache_members=False, max_messages=None),
+}
+
+
+def get_cache_profile() -> CacheProfile:
+    """Profile named by CACHE_PROFILE (default 'full'); MAX_MESSAGES overrides its message cache size, 0 disables it."""
+    name = getenv('CACHE_PROFILE', 'full').lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown CACHE_PROFILE '{name}', expected one of {', '.join(PROFILES)}")
+    profile = PROFILES[name]
+    max_messages = getenv('MAX_MESSAGES')
+    if max_messages:
+        profile = profile._replace(max_messages=int(max_messages) or None)
+    return profile
+
+
+def resident_memory_mb() -> float:
+    """Current resident set size, or the peak where /proc is not available."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    # ru_maxrss is KiB on Linux and bytes on macOS; this fallback is only hit on the latter
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
@@ -0,0 +1,35 @@
+import hashlib
+import json
+from typing import Optional
+import discord
+from discord import app_commands
+from db.persistent_db import get_state, set_state
+from utils.loggingsetup import getlog
+
+
+def command_tree_hash(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Hash of the payload tree.sync(guild=guild) would upload, independent of registration order."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command['type'], command['name']),
+    )
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+async def sync_command_tree(bot, guild: Optional[discord.abc.Snowflake] = None, force: bool = False) -> Optional[int]:
+    """Sync the tree for one scope unless the stored hash shows Discord already has it.
+
+    Returns the number of commands synced, or None when the sync was skipped.
+    The hash is stored per application and scope, so a dev and a prod bot can
+    share one database.
+    """
+    scope = f"guild:{guild.id}" if guild else "global"
+    key = f"command_tree:{bot.application_id}:{scope}"
+    digest = command_tree_hash(bot.tree, guild)
+    if not force and await get_state(key) == digest:
+        getlog().info(f"Command tree ({scope}) unchanged, skipping sync.")
+        return None
+    synced = await bot.tree.sync(guild=guild)
+    await set_state(key, digest)
+    getlog().info(f"Synced {len(synced)} tree commands ({scope}).")
+    return len(synced)
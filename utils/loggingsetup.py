@@ -1,22 +1,117 @@
+import atexit
+import json
 import logging
 import logging.handlers
+import queue
+import time
+from collections import Counter
+from os import getenv
+from typing import Dict
+
+
+# Attributes every LogRecord has; anything else on a record came from `extra=` and is written as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, module, line, msg, plus any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'line': record.lineno,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class HotPathFilter(logging.Filter):
+    """Rate limits DEBUG and INFO records per source module with a token bucket.
+
+    `limits` maps a module name (the file name, e.g. persistent_db) to the
+    records per second it may log; modules without a limit are not filtered,
+    and warnings and errors always pass. The first record a module logs after
+    some were dropped carries `suppressed=<count>`, so the log shows the gap.
+    """
+
+    def __init__(self, limits: Dict[str, float]) -> None:
+        super().__init__()
+        self.limits = limits
+        self._tokens: Dict[str, float] = {}
+        self._refilled: Dict[str, float] = {}
+        self._suppressed: Counter = Counter()
+        self.dropped: Counter = Counter()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.limits.get(record.module)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        tokens = min(rate, self._tokens.get(record.module, rate) + (now - self._refilled.get(record.module, now)) * rate)
+        self._refilled[record.module] = now
+        if tokens < 1:
+            self._tokens[record.module] = tokens
+            self._suppressed[record.module] += 1
+            self.dropped[record.module] += 1
+            return False
+        self._tokens[record.module] = tokens - 1
+        suppressed = self._suppressed.pop(record.module, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """'persistent_db=10,role_refactor=20' -> {'persistent_db': 10.0, 'role_refactor': 20.0}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        module, _, rate = item.partition('=')
+        limits[module.strip()] = float(rate)
+    return limits
+
+
+def build_listener(log_queue: queue.SimpleQueue, filename: str, json_lines: bool) -> logging.handlers.QueueListener:
+    """A listener thread that formats, writes and rotates everything put on log_queue."""
+    file_handler = logging.handlers.RotatingFileHandler(
+        filename=filename,
+        encoding='utf-8',
+        maxBytes=32 * 1024 * 1024,  # 32 MiB
+        backupCount=5,  # Rotate through 5 files
+    )
+    dt_fmt = '%Y-%m-%d %H:%M:%S'
+    if json_lines:
+        file_handler.setFormatter(JsonLinesFormatter(datefmt=dt_fmt))
+    else:
+        file_handler.setFormatter(logging.Formatter('[{asctime}] [{levelname:<8}] {name}: {message}', dt_fmt, style='{'))
+    return logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
 
 
 logger = logging.getLogger('discord')
-logger.setLevel(logging.INFO)
-
-handler = logging.handlers.RotatingFileHandler(
-    filename='discord_bot.log',
-    encoding='utf-8',
-    maxBytes=32 * 1024 * 1024,  # 32 MiB
-    backupCount=5,  # Rotate through 5 files
-)
-
-dt_fmt = '%Y-%m-%d %H:%M:%S'
-formatter = logging.Formatter('[{asctime}] [{levelname:<8}] {name}: {message}', dt_fmt, style='{')
-handler.setFormatter(formatter)
+logger.setLevel(getenv('LOG_LEVEL', 'INFO').upper())
+
+# The event loop only puts records on a queue; formatting, file writes and rotation run on the listener thread
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+handler = logging.handlers.QueueHandler(log_queue)
+# Dropped before they are queued, so suppressed hot-path records cost one dict lookup
+hot_path_filter = HotPathFilter(parse_rate_limits(getenv('LOG_RATE_LIMITS', 'persistent_db=10,role_refactor=20')))
+handler.addFilter(hot_path_filter)
 logger.addHandler(handler)
 
+listener = build_listener(log_queue, 'discord_bot.log', getenv('LOG_FORMAT', 'json').lower() == 'json')
+listener.start()
+# Drains the queue before logging.shutdown closes the file
+atexit.register(listener.stop)
+
 def getlog():
     global logger
     return logger
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from os import getenv
+from typing import Deque, Optional
+from utils.loggingsetup import getlog, handler
+from utils.metrics import Counter, Gauge, Histogram, metrics
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up, and catches what is blocking it.
+
+    A task on the loop sleeps `interval` seconds at a time and records how
+    much later than that it woke up. A watchdog thread checks the task's
+    heartbeat. When the loop has not come back for `threshold` seconds, the
+    thread captures the loop thread's stack, which shows the callback that
+    is holding the loop, and the task logs it once the loop is free again.
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, keep: int = 1000) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: Deque[float] = deque(maxlen=keep)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.last_stack: Optional[str] = None
+        self._heartbeat = time.monotonic()
+        self._captured: Optional[str] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self.histogram = metrics.register(Histogram(
+            'bot_loop_lag_seconds', 'How late the event loop ran a timer, sampled every interval',
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 3.0)))
+        metrics.register(Gauge('bot_loop_lag_recent_seconds', 'Loop lag over the last samples', self.recent, labels=('stat',)))
+        self.stall_counter = metrics.register(Counter('bot_loop_stalls_total', 'Times the loop was blocked longer than the threshold'))
+
+    def percentile(self, p: float) -> float:
+        if not self.lags:
+            return 0.0
+        ordered = sorted(self.lags)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def recent(self) -> dict:
+        return {('p50',): self.percentile(50), ('p99',): self.percentile(99), ('max',): max(self.lags, default=0.0)}
+
+    def as_dict(self) -> dict:
+        return {'p50': self.percentile(50), 'p99': self.percentile(99), 'max': self.max_lag, 'stalls': self.stalls}
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        # Read here rather than at import, so the values in .env apply however the module was imported
+        self.interval = float(getenv('LOOP_LAG_INTERVAL', str(self.interval)))
+        self.threshold = float(getenv('LOOP_LAG_THRESHOLD', str(self.threshold)))
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        threading.Thread(target=self._watch, name='loop-lag-watchdog', daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _measure(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self._heartbeat = time.monotonic()
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self.histogram.observe(lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                self.stall_counter.inc()
+                stack, self._captured = self._captured, None
+                if stack:
+                    self.last_stack = stack
+                    getlog().warning(f"Event loop blocked for {lag:.3f}s, loop thread was at:\n{stack}")
+                else:
+                    # Blocked for less than the watchdog's check interval past the threshold
+                    getlog().warning(f"Event loop blocked for {lag:.3f}s.")
+
+    def _watch(self) -> None:
+        # Runs on its own thread, so it still gets scheduled while the loop thread holds the GIL between bytecodes
+        while not self._stop.wait(self.threshold / 4):
+            if self._captured is None and time.monotonic() - self._heartbeat > self.interval + self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._captured = ''.join(traceback.format_stack(frame))
+
+
+def enable_slow_callback_warnings(loop: asyncio.AbstractEventLoop, threshold: float) -> None:
+    """asyncio's debug mode: logs every callback that runs longer than `threshold` on the 'asyncio' logger.
+
+    Debug mode also tracks where each coroutine was created, which costs CPU
+    on every task, so it is opt-in (LOOP_DEBUG=1).
+    """
+    loop.set_debug(True)
+    loop.slow_callback_duration = threshold
+    asyncio_logger = logging.getLogger('asyncio')
+    asyncio_logger.setLevel(logging.WARNING)
+    # Same queue handler as the bot's own records, so the warnings land in discord_bot.log
+    asyncio_logger.addHandler(handler)
+
+
+loop_lag = LoopLagMonitor()
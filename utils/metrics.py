@@ -0,0 +1,175 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from aiohttp import web
+from utils.loggingsetup import getlog
+
+# Seconds; covers a cached dict read up to a rate limited REST call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per combination of label values."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for label_values, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket
+                bucket_labels = _labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, label_values)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, label_values)} {count}')
+        return lines
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_labels(self.label_names, values)} {value}' for values, value in sorted(self.values.items())]
+
+
+class Gauge:
+    """Read when scraped: `read` returns one number, or a dict of label values to numbers."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Union[float, Dict[Tuple, float]]], labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self.read = read
+
+    def samples(self) -> List[str]:
+        value = self.read()
+        if not isinstance(value, dict):
+            return [f'{self.name} {value}']
+        return [f'{self.name}{_labels(self.label_names, values)} {number}' for values, number in sorted(value.items())]
+
+
+class MetricsRegistry:
+    """Metrics by name, rendered in the Prometheus text exposition format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Union[Histogram, Counter, Gauge]] = {}
+
+    def register(self, metric):
+        # Registering a name again replaces the metric, so a new Bot or reloaded cog can re-add its gauges
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                getlog().error(f"Could not read metric {metric.name}: {e}")
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def hit_ratios(counter: Counter) -> Dict[Tuple, float]:
+    """(cache,) -> hits / lookups, from a counter labelled (cache, result)."""
+    hits: Dict[Tuple, float] = {}
+    lookups: Dict[Tuple, float] = {}
+    for (cache, result), value in counter.values.items():
+        lookups[(cache,)] = lookups.get((cache,), 0) + value
+        if result == 'hit':
+            hits[(cache,)] = hits.get((cache,), 0) + value
+    return {cache: hits.get(cache, 0) / total for cache, total in lookups.items() if total}
+
+
+class MetricsServer:
+    """Serves GET /metrics from the bot's own event loop, on aiohttp (already a discord.py dependency)."""
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.registry.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        getlog().info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+metrics = MetricsRegistry()
+
+menu_callback_seconds = metrics.register(Histogram(
+    'bot_menu_callback_seconds', 'Role menu click to final reply, by reply path', labels=('path',)))
+db_query_seconds = metrics.register(Histogram(
+    'bot_db_query_seconds', 'persistent_db call time, by function', labels=('op',)))
+rest_request_seconds = metrics.register(Histogram(
+    'bot_rest_request_seconds', 'Discord REST request time including rate limit waits, by route', labels=('route',)))
+gateway_latency_seconds = metrics.register(Histogram(
+    'bot_gateway_latency_seconds', 'Gateway heartbeat round trip, one observation per heartbeat acknowledged',
+    buckets=(0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5, 1.0, 2.5)))
+cache_requests = metrics.register(Counter(
+    'bot_cache_requests_total', 'In-memory cache lookups, by cache and hit or miss', labels=('cache', 'result')))
+metrics.register(Gauge('bot_cache_hit_ratio', 'Share of cache lookups served from memory', lambda: hit_ratios(cache_requests), labels=('cache',)))
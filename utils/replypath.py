@@ -0,0 +1,82 @@
+import asyncio
+from collections import Counter, deque
+from os import getenv
+from typing import Awaitable
+import discord
+
+DIRECT = 'direct'
+DEFERRED = 'deferred'
+
+# Discord drops an interaction that has no response 3 seconds after it was created
+INTERACTION_DEADLINE = 3.0
+# Time left for the response request itself to reach Discord
+SAFETY_MARGIN = 0.5
+
+
+class ReplyPathStats:
+    """Which reply path each interaction took and how long its work ran, for tuning the budget."""
+
+    def __init__(self, keep: int = 1000) -> None:
+        self.paths: Counter = Counter()
+        self.durations = deque(maxlen=keep)
+
+    def record(self, path: str, seconds: float) -> None:
+        self.paths[path] += 1
+        self.durations.append(seconds)
+
+    def percentile(self, p: float) -> float:
+        if not self.durations:
+            return 0.0
+        ordered = sorted(self.durations)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def as_dict(self) -> dict:
+        return {
+            DIRECT: self.paths[DIRECT],
+            DEFERRED: self.paths[DEFERRED],
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+async def reply_within_budget(
+    interaction: discord.Interaction,
+    work: Awaitable[dict],
+    budget: float,
+    stats: ReplyPathStats,
+    notice: dict = None,
+) -> str:
+    """Answer with one send_message if `work` finishes in `budget` seconds, else defer and follow up.
+
+    `work` returns the keyword arguments of the reply (content/embed). The
+    budget is cut short when the interaction reached us late, so the direct
+    path never misses Discord's 3 second deadline. A `notice` forces the
+    deferred path and is sent as a followup before the final reply.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    task = asyncio.ensure_future(work)
+
+    age = max(0.0, (discord.utils.utcnow() - interaction.created_at).total_seconds())
+    budget = min(budget, INTERACTION_DEADLINE - SAFETY_MARGIN - age)
+
+    if notice is None and budget > 0:
+        done, _ = await asyncio.wait({task}, timeout=budget)
+        if task in done:
+            await interaction.response.send_message(ephemeral=True, **task.result())
+            stats.record(DIRECT, loop.time() - start)
+            return DIRECT
+
+    await interaction.response.defer(ephemeral=True)
+    if notice is not None:
+        await interaction.followup.send(ephemeral=True, **notice)
+    reply = await task
+    stats.record(DEFERRED, loop.time() - start)
+    await interaction.followup.send(ephemeral=True, **reply)
+    return DEFERRED
+
+
+REPLY_BUDGET = float(getenv('ROLE_REPLY_BUDGET', '1.5'))
+
+reply_stats = ReplyPathStats()
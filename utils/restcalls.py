@@ -0,0 +1,69 @@
+import logging
+import re
+import time
+from collections import Counter
+from functools import wraps
+from utils.metrics import rest_request_seconds
+
+SNOWFLAKE_PATTERN = re.compile(r'\d{15,}')
+GUILD_PATTERN = re.compile(r'^guilds/(\d+)')
+
+
+class RestCallCounter:
+    """Counts and times REST requests made through a discord.py HTTPClient.
+
+    Routes are keyed by method and path template (e.g. 'PATCH /channels/{channel_id}/messages/{message_id}')
+    so counts group the same way Discord groups rate limit buckets.
+    Interaction responses and followups go through the webhook adapter and are not counted here.
+    """
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.by_route: Counter = Counter()
+
+    def install(self, http) -> None:
+        original = http.request
+
+        @wraps(original)
+        async def counted_request(route, **kwargs):
+            self.total += 1
+            self.by_route[route.key] += 1
+            # Includes discord.py's own waits for rate limit buckets and retries, which is what callers feel
+            start = time.perf_counter()
+            try:
+                return await original(route, **kwargs)
+            finally:
+                rest_request_seconds.observe(time.perf_counter() - start, route.key)
+
+        http.request = counted_request
+
+
+class RateLimitCounter(logging.Handler):
+    """Counts the 429 responses discord.py reports on the 'discord.http' logger.
+
+    discord.py retries rate limited requests internally and only logs them,
+    so the log records are the one place every 429 can be seen.
+    Snowflakes in the URL are folded to {id} for by_route; by_guild uses the guild id of /guilds/... routes.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(logging.WARNING)
+        self.total = 0
+        self.global_hits = 0
+        self.by_route: Counter = Counter()
+        self.by_guild: Counter = Counter()
+
+    def install(self, logger_name: str = 'discord.http') -> None:
+        logging.getLogger(logger_name).addHandler(self)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.msg.startswith('Global rate limit'):
+            self.global_hits += 1
+        elif record.msg.startswith('We are being rate limited') and len(record.args) >= 2:
+            method, url = record.args[0], str(record.args[1])
+            self.total += 1
+            path = url.split('/api/v', 1)[-1].split('/', 1)[-1]
+            self.by_route[f"{method} /{SNOWFLAKE_PATTERN.sub('{id}', path)}"] += 1
+            guild = GUILD_PATTERN.search(path)
+            if guild:
+                self.by_guild[int(guild.group(1))] += 1
@@ -0,0 +1,97 @@
+import asyncio
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Hashable, Iterable, TypeVar
+from utils.loggingsetup import getlog
+
+T = TypeVar('T')
+
+# Outcomes a restore job can report
+RESTORED = 'restored'
+DELETED = 'deleted'
+FORBIDDEN = 'forbidden'
+FAILED = 'failed'
+
+
+class RestoreProgress:
+    def __init__(self, total: int = 0) -> None:
+        self.total = total
+        self.counts: Counter = Counter()
+        # Restored menus that needed a message edit, and those whose roles were unchanged
+        self.edited = 0
+        self.skipped = 0
+
+    @property
+    def done(self) -> int:
+        return sum(self.counts.values())
+
+    def record(self, outcome: str) -> None:
+        self.counts[outcome] += 1
+
+    def as_dict(self) -> dict:
+        # The four standard outcomes are always present, even at zero
+        return {
+            'total': self.total,
+            **{outcome: self.counts[outcome] for outcome in (RESTORED, DELETED, FORBIDDEN, FAILED)},
+            **self.counts,
+            'edited': self.edited,
+            'skipped_edits': self.skipped,
+        }
+
+
+class RestoreScheduler:
+    """Runs restore jobs concurrently within a REST budget.
+
+    Jobs sharing a bucket key run one after another, so no rate limit bucket
+    ever has two requests from us in flight. Different buckets (and therefore
+    different guilds) run in parallel. Jobs wrap their REST calls in
+    rest_slot(), which caps concurrent requests at `concurrency` and spaces
+    them to at most `rate` per second. Jobs that make no REST call are not
+    throttled.
+    """
+
+    def __init__(self, concurrency: int = 8, rate: float = 40.0) -> None:
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self._semaphore = None
+        self._rate_lock = None
+        self._next_slot = 0.0
+
+    @asynccontextmanager
+    async def rest_slot(self):
+        async with self._semaphore:
+            if self.rate > 0:
+                async with self._rate_lock:
+                    loop = asyncio.get_running_loop()
+                    now = loop.time()
+                    if self._next_slot > now:
+                        await asyncio.sleep(self._next_slot - now)
+                        now = self._next_slot
+                    self._next_slot = now + 1 / self.rate
+            yield
+
+    async def run(
+        self,
+        items: Iterable[T],
+        bucket: Callable[[T], Hashable],
+        job: Callable[[T], Awaitable[str]],
+        progress: RestoreProgress,
+    ) -> RestoreProgress:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._rate_lock = asyncio.Lock()
+
+        buckets = defaultdict(list)
+        for item in items:
+            buckets[bucket(item)].append(item)
+
+        async def drain(bucket_items):
+            for item in bucket_items:
+                try:
+                    outcome = await job(item)
+                except Exception as e:
+                    getlog().error(f"Restore job for {item} failed: {e}")
+                    outcome = FAILED
+                progress.record(outcome)
+
+        await asyncio.gather(*(drain(bucket_items) for bucket_items in buckets.values()))
+        return progress
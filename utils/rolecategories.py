@@ -0,0 +1,157 @@
+import re
+from typing import Dict, List, Optional
+from db.persistent_db import fetch_role_categories, upsert_role_categories, delete_role_category
+from utils.loggingsetup import getlog
+
+MATCHERS = ('xp', 'keyword', 'regex')
+POWER_PATTERN = re.compile(r'(\d+)')
+XP_PATTERN = re.compile(r'xp', re.IGNORECASE)
+
+SINGLE_PLACEHOLDER = "Choose a role to assign (removes previous role)..."
+MULTI_PLACEHOLDER = "Choose roles to assign/remove..."
+
+# Keys end up in menu custom_ids, rs_{key}_{guild_id}_{message_id} (see utils/roledropdowns.py), which
+# Discord caps at 100 characters and which only dispatch when the key matches the template's [\w-]
+CUSTOM_ID_LIMIT = 100
+SNOWFLAKE_DIGITS = 20
+KEY_MAX_LENGTH = CUSTOM_ID_LIMIT - len('rs___') - 2 * SNOWFLAKE_DIGITS
+KEY_PATTERN = re.compile(r'[\w-]+')
+
+
+class RoleCategory:
+    """One kind of role menu, e.g. NA XP roles or pingable roles.
+
+    matcher decides which roles belong to the category:
+    - 'xp': the name contains 'xp' and the pattern text, like 'NA 2500 XP'
+    - 'keyword': the name contains the pattern text
+    - 'regex': the pattern is a regular expression searched in the name
+    All matching is case-insensitive. When min_value or max_value is set, the
+    first number in the role name must also fall in that range.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        matcher: str,
+        pattern: str,
+        title: str,
+        description: str,
+        min_value: Optional[int] = None,
+        max_value: Optional[int] = None,
+        multi_select: bool = False,
+        placeholder: Optional[str] = None,
+        guild_id: int = 0,
+    ) -> None:
+        if not KEY_PATTERN.fullmatch(key) or len(key) > KEY_MAX_LENGTH:
+            raise ValueError(f"Key must be 1-{KEY_MAX_LENGTH} letters, digits, '_' or '-'")
+        if matcher not in MATCHERS:
+            raise ValueError(f"Unknown matcher '{matcher}', expected one of {', '.join(MATCHERS)}")
+        if min_value is not None and max_value is not None and min_value > max_value:
+            raise ValueError(f"min_value {min_value} is above max_value {max_value}, no role could match")
+        self.guild_id = guild_id
+        self.key = key
+        self.matcher = matcher
+        self.pattern = pattern
+        self.min_value = min_value
+        self.max_value = max_value
+        self.multi_select = bool(multi_select)
+        self.title = title
+        self.description = description
+        self.placeholder = placeholder or (MULTI_PLACEHOLDER if self.multi_select else SINGLE_PLACEHOLDER)
+        # Compiled once here; raises re.error for an invalid regex before anything is stored
+        self._search = re.compile(pattern if matcher == 'regex' else re.escape(pattern), re.IGNORECASE).search
+
+    @classmethod
+    def from_row(cls, row) -> 'RoleCategory':
+        guild_id, key, matcher, pattern, min_value, max_value, multi_select, title, description, placeholder = row
+        return cls(key, matcher, pattern, title, description, min_value, max_value, multi_select, placeholder, guild_id)
+
+    def to_row(self) -> tuple:
+        return (
+            self.guild_id, self.key, self.matcher, self.pattern, self.min_value, self.max_value,
+            self.multi_select, self.title, self.description, self.placeholder,
+        )
+
+    def matches(self, role_name: str) -> bool:
+        if not self._search(role_name):
+            return False
+        if self.matcher == 'xp' and not XP_PATTERN.search(role_name):
+            return False
+        if self.min_value is None and self.max_value is None:
+            return True
+        match = POWER_PATTERN.search(role_name)
+        power = int(match.group(1)) if match else 0
+        return (self.min_value is None or power >= self.min_value) and (self.max_value is None or power <= self.max_value)
+
+
+# Seeded as guild_id 0 rows; existing rows (including edited defaults) are never overwritten
+DEFAULT_CATEGORIES = [
+    RoleCategory('na', 'xp', 'na', "Western XP Roles", "Select Your Tentatek Division Power", min_value=2000, max_value=2900),
+    RoleCategory('jp', 'xp', 'jp', "Japan XP Roles", "Select Your Takoroka Division Power", min_value=2000, max_value=2900),
+    RoleCategory('rank', 'keyword', 'rank', "Ranked Roles", "Select Your Most Recent Rank"),
+    RoleCategory('ping', 'keyword', 'ping', "Pingable Roles", "Select All Roles You Want Pings For", multi_select=True),
+]
+
+
+class RoleCategoryRegistry:
+    """Category definitions from the role_categories table, compiled once at load.
+
+    guild_id 0 rows apply to every guild; a guild's own row with the same key
+    replaces the default for that guild only.
+    """
+
+    def __init__(self) -> None:
+        self._defaults: Dict[str, RoleCategory] = {}
+        self._overrides: Dict[int, Dict[str, RoleCategory]] = {}
+        self._merged: Dict[int, Dict[str, RoleCategory]] = {}
+
+    async def load(self) -> None:
+        await upsert_role_categories([category.to_row() for category in DEFAULT_CATEGORIES], replace=False)
+        self._defaults.clear()
+        self._overrides.clear()
+        self._merged.clear()
+        for row in await fetch_role_categories():
+            try:
+                self._index(RoleCategory.from_row(row))
+            except (ValueError, re.error) as e:
+                getlog().error(f"Skipping invalid role category {row[1]} for guild {row[0]}: {e}")
+        getlog().info(f"Loaded {len(self._defaults)} default and {sum(map(len, self._overrides.values()))} guild role categories.")
+
+    def for_guild(self, guild_id: int) -> Dict[str, RoleCategory]:
+        merged = self._merged.get(guild_id)
+        if merged is None:
+            merged = self._merged[guild_id] = {**self._defaults, **self._overrides.get(guild_id, {})}
+        return merged
+
+    def get(self, guild_id: int, key: str) -> Optional[RoleCategory]:
+        return self.for_guild(guild_id).get(key)
+
+    def keys(self, guild_id: int) -> List[str]:
+        return list(self.for_guild(guild_id))
+
+    async def put(self, category: RoleCategory) -> None:
+        await upsert_role_categories([category.to_row()])
+        self._index(category)
+
+    async def delete(self, guild_id: int, key: str) -> bool:
+        """Remove a guild's own category, or with guild_id 0 a default. Returns whether there was one."""
+        categories = self._defaults if guild_id == 0 else self._overrides.get(guild_id, {})
+        if categories.pop(key, None) is None:
+            return False
+        await delete_role_category(guild_id, key)
+        if guild_id == 0:
+            self._merged.clear()
+        else:
+            self._merged.pop(guild_id, None)
+        return True
+
+    def _index(self, category: RoleCategory) -> None:
+        if category.guild_id == 0:
+            self._defaults[category.key] = category
+            self._merged.clear()
+        else:
+            self._overrides.setdefault(category.guild_id, {})[category.key] = category
+            self._merged.pop(category.guild_id, None)
+
+
+role_categories = RoleCategoryRegistry()
@@ -0,0 +1,60 @@
+from typing import FrozenSet, Iterable, NamedTuple, Optional
+import discord
+
+
+class RoleEdit(NamedTuple):
+    """The role IDs a member has now and the IDs they should end up with."""
+    current: FrozenSet[int]
+    desired: FrozenSet[int]
+
+    @property
+    def added(self) -> FrozenSet[int]:
+        return self.desired - self.current
+
+    @property
+    def removed(self) -> FrozenSet[int]:
+        return self.current - self.desired
+
+    @property
+    def changed(self) -> bool:
+        return self.current != self.desired
+
+
+def member_role_ids(member: discord.Member) -> FrozenSet[int]:
+    # @everyone shares the guild's id and is never sent in a role edit
+    return frozenset(role.id for role in member.roles if role.id != member.guild.id)
+
+
+def plan_role_edit(current: Iterable[int], add: Iterable[int] = (), remove: Iterable[int] = ()) -> RoleEdit:
+    """Removals are applied first, so an ID in both add and remove ends up kept."""
+    current = frozenset(current)
+    return RoleEdit(current, (current - frozenset(remove)) | frozenset(add))
+
+
+def plan_swap(current: Iterable[int], category_ids: Iterable[int], selected_id: int) -> RoleEdit:
+    # Single-select menus: drop every other role of the category, keep or add the selected one
+    return plan_role_edit(current, add=(selected_id,), remove=category_ids)
+
+
+def plan_toggle(current: Iterable[int], selected_ids: Iterable[int]) -> RoleEdit:
+    # Multi-select menus: each selected role flips
+    current = frozenset(current)
+    selected = frozenset(selected_ids)
+    return RoleEdit(current, current ^ selected)
+
+
+async def apply_role_edit(member: discord.Member, edit: RoleEdit, reason: Optional[str] = None) -> Optional[discord.Member]:
+    """Apply the edit's added and removed IDs to `member`'s roles in one member edit.
+
+    The role list sent is rebuilt from `member` at request time, not taken
+    from edit.desired, so roles another moderator or bot changed since the
+    edit was planned are kept. Replacing the list in a single request means a
+    failure leaves the member with either the old roles or the new ones,
+    never half of each. Returns the member as Discord sent it back, or None
+    when nothing needed to change.
+    """
+    current = member_role_ids(member)
+    desired = (current - edit.removed) | edit.added
+    if desired == current:
+        return None
+    return await member.edit(roles=[discord.Object(id=role_id) for role_id in desired], reason=reason)
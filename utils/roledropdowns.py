@@ -1,262 +1,163 @@
 import discord
+import time
+from typing import Optional
 from utils.embeds import BotConfirmationEmbed
-
-
-class RoleSelectPowers(discord.ui.Select):
-    def __init__(self, region_key, guild_id, msg_id, bot=None):
-        super().__init__(
-            custom_id=f"rs_{region_key}_{guild_id}_{msg_id}",
-            placeholder="Choose a role to assign (removes previous role)...",
-            options=[discord.SelectOption(label="Loading...", value="loading")],
-            min_values=1,
-            max_values=1
-        )
-        self.region_key = region_key
-        self.guild_id = guild_id
-        self.msg_id = msg_id
-        self.bot = bot
-        self.assignable_roles = {}
-        self.all_assignable_roles = []
-
-    def update_roles(self, role_list: list):
-        self.assignable_roles = {str(role.id): role for role in role_list}
-        self.all_assignable_roles = role_list
-
-        options = []
-        for role in role_list[:25]:
-            options.append(discord.SelectOption(label=role.name, value=str(role.id)))
-        self.options = options or [discord.SelectOption(label="No roles available", value="none")]
-
-    async def callback(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True)
-        
-        try:
-            # Load roles if needed (for persistent views after restart)
-            if not self.all_assignable_roles and self.bot:
-                role_cog = self.bot.get_cog('Roles')
-                if role_cog and interaction.guild:
-                    filtered_roles = role_cog.filter_xp_roles(key=self.region_key, iterable=interaction.guild.roles)
-                    self.update_roles(filtered_roles)
-
-            # Validate selection
-            if not self.all_assignable_roles or self.values[0] in ["none", "loading"]:
-                await interaction.followup.send("❌ No valid roles available.", ephemeral=True)
-                return
-
-            cmd_user = interaction.user
-            selected_role = self.assignable_roles[self.values[0]]
-
-            # Remove existing roles from this category
-            roles_to_remove = [role for role in self.all_assignable_roles if role in cmd_user.roles]
-
-            try:
-                if roles_to_remove:
-                    await cmd_user.remove_roles(*roles_to_remove)
-
-                if selected_role not in roles_to_remove:
-                    removed_roles_names = ", ".join(role.name for role in roles_to_remove) if roles_to_remove else "No Previous XP Role"
-                    await cmd_user.add_roles(selected_role)
-                    await interaction.followup.send(embed=BotConfirmationEmbed(
-                        description=f"✅ **Added role:** {selected_role.name}\n❌**Removed role:** {removed_roles_names}"),
-                        ephemeral=True
-                    )
-                else:
-                    await interaction.followup.send(embed=BotConfirmationEmbed(description=f"You already have the {selected_role.name} role."), ephemeral=True)
-
-            except discord.Forbidden:
-                await interaction.followup.send("❌ Missing permissions for role management", ephemeral=True)
-            except discord.HTTPException:
-                await interaction.followup.send("❌ Failed to modify roles", ephemeral=True)
-        except Exception as e:
-            print(e)
-
-
-class RoleViewPowers(discord.ui.View):
-    def __init__(self, region_key, guild_id, msg_id, bot=None):
-        super().__init__(timeout=None)
-        self.add_item(RoleSelectPowers(region_key=region_key, guild_id=guild_id, msg_id=msg_id, bot=bot))
-
-    def update_roles(self, new_roles: list):
-        self.children[0].update_roles(new_roles)
-
-
-class RoleSelectRanks(discord.ui.Select):
-    def __init__(self, guild_id, msg_id, bot=None):
-        super().__init__(
-            custom_id=f"rs_ranks_{guild_id}_{msg_id}",
-            placeholder="Choose a role to assign (removes previous role)...",
-            options=[discord.SelectOption(label="Loading...", value="loading")],
-            min_values=1,
-            max_values=1
-        )
-        self.guild_id = guild_id
-        self.msg_id = msg_id
-        self.bot = bot
-        self.assignable_roles = {}
-        self.all_assignable_roles = []
-
-    def update_roles(self, role_list: list):
-        self.assignable_roles = {str(role.id): role for role in role_list}
-        self.all_assignable_roles = role_list
-
-        options = []
-        for role in role_list[:25]:
-            options.append(discord.SelectOption(label=role.name, value=str(role.id)))
-        self.options = options or [discord.SelectOption(label="No roles available", value="none")]
-
-    async def callback(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True)
-
-        # Load roles if needed (for persistent views after restart)
-        if not self.all_assignable_roles and self.bot:
-            role_cog = self.bot.get_cog('Roles')
-            if role_cog and interaction.guild:
-                filtered_roles = role_cog.filter_rank_roles(iterable=interaction.guild.roles)
-                self.update_roles(filtered_roles)
-
-        # Validate selection
-        if not self.all_assignable_roles or self.values[0] in ["none", "loading"]:
-            await interaction.followup.send("❌ No valid roles available.", ephemeral=True)
-            return
-
-        member = interaction.user
-        selected_role = self.assignable_roles[self.values[0]]
-
-        # Remove existing roles from this category
-        roles_to_remove = [role for role in self.all_assignable_roles if role in member.roles]
-
-        try:
-            if roles_to_remove:
-                await member.remove_roles(*roles_to_remove)
-
-            if selected_role not in roles_to_remove:
-                await member.add_roles(selected_role)
-                if roles_to_remove:
-                    await interaction.followup.send(embed=BotConfirmationEmbed(
-                        description=f"✅ **Added role:** {selected_role.name}\n❌ **Removed role:** {roles_to_remove[0].name}"),
-                        ephemeral=True
-                    )
-                else:
-                    await interaction.followup.send(embed=BotConfirmationEmbed(
-                        description=f"✅ **Added role:** {selected_role.name}"),
-                        ephemeral=True
-                    )
-            else:
-                await interaction.followup.send(embed=BotConfirmationEmbed(description=f"You already have the {selected_role.name} role."), ephemeral=True)
-
-        except discord.Forbidden:
-            await interaction.followup.send("❌ Missing permissions for role management", ephemeral=True)
-        except discord.HTTPException:
-            await interaction.followup.send("❌ Failed to modify roles", ephemeral=True)
-
-
-class RoleViewRanks(discord.ui.View):
-    def __init__(self, guild_id, msg_id, bot=None):
-        super().__init__(timeout=None)
-        self.add_item(RoleSelectRanks(guild_id=guild_id, msg_id=msg_id, bot=bot))
-
-    def update_roles(self, new_roles: list):
-        self.children[0].update_roles(new_roles)
-
-class RoleSelectPings(discord.ui.Select):
-    def __init__(self, guild_id, msg_id, bot=None):
-        super().__init__(
-            custom_id=f"rs_ping_{guild_id}_{msg_id}",
-            placeholder="Choose roles to assign/remove...",
-            options=[discord.SelectOption(label="Loading...", value="loading")],
-            min_values=1,
-            max_values=1  # will update dynamically
-        )
+from utils.metrics import menu_callback_seconds
+from utils.rolecategories import RoleCategory, role_categories
+from utils.rolediff import plan_swap, plan_toggle
+from utils.roleindex import role_index
+from utils.replypath import REPLY_BUDGET, reply_stats, reply_within_budget
+from utils.rolequeue import QueueFull, role_mutation_queue
+from utils.roleserializer import member_role_serializer
+
+# rs_{category}_{guild_id}_{message_id}; same format menus have always been posted with
+CUSTOM_ID_TEMPLATE = r'rs_(?P<key>[\w-]+?)_(?P<guild_id>[0-9]+)_(?P<message_id>[0-9]+)'
+QUEUED_NOTICE = "⏳ Lots of role changes right now, yours is queued and will apply shortly."
+
+
+class RoleMenuSelect(discord.ui.DynamicItem[discord.ui.Select], template=CUSTOM_ID_TEMPLATE):
+    """Dropdown for one role category, dispatched by its custom_id.
+
+    The class is registered once with bot.add_dynamic_items. discord.py
+    builds an instance from the custom_id only when a menu is clicked, and
+    roles are looked up in the shared role index, so menus need no
+    per-message View objects, not even after a restart.
+
+    Single-select categories (XP, ranks) swap the member's role in the
+    category for the selected one. Multi-select categories (pings) toggle
+    every selected role.
+    """
+
+    def __init__(self, key: str, guild_id: int, message_id: int, select: Optional[discord.ui.Select] = None):
+        super().__init__(select or discord.ui.Select(custom_id=f"rs_{key}_{guild_id}_{message_id}"))
+        self.key = key
         self.guild_id = guild_id
-        self.msg_id = msg_id
-        self.bot = bot
-        self.assignable_roles = {}
-        self.all_assignable_roles = []
-
-    def update_roles(self, role_list: list):
-        self.assignable_roles = {str(role.id): role for role in role_list}
-        self.all_assignable_roles = role_list
-
-        if role_list:
-            options = [
+        self.message_id = message_id
+
+    @classmethod
+    def render(cls, category: RoleCategory, guild_id: int, message_id: int, roles: list) -> 'RoleMenuSelect':
+        """The menu as posted: the first 25 roles of the category as options."""
+        item = cls(category.key, guild_id, message_id)
+        select = item.item
+        select.placeholder = category.placeholder
+        select.min_values = 1
+        if roles:
+            select.options = [
                 discord.SelectOption(
                     label=role.name.strip() or f"Role {role.id}",
                     value=str(role.id)
                 )
-                for role in role_list[:25]
+                for role in roles[:25]
             ]
-            self.options = options
-            self.min_values = 1
-            self.max_values = min(len(options), 25)  # max 25 options selectable
+            select.max_values = min(len(select.options), 25) if category.multi_select else 1
         else:
-            self.options = [discord.SelectOption(label="No roles available", value="none")]
-            self.min_values = 1
-            self.max_values = 1
+            select.options = [discord.SelectOption(label="No roles available", value="none")]
+            select.max_values = 1
+        return item
 
-    async def callback(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True)
-
-        # Load roles if needed
-        if not self.all_assignable_roles and self.bot:
-            role_cog = self.bot.get_cog('Roles')
-            if role_cog and interaction.guild:
-                filtered_roles = role_cog.filter_ping_roles(iterable=interaction.guild.roles)
-                self.update_roles(filtered_roles)
-
-        # Validate selection
-        if not self.all_assignable_roles or any(val in ["none", "loading"] for val in self.values):
-            await interaction.followup.send("❌ No valid roles available.", ephemeral=True)
-            return
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        # Reuses the select parsed from the clicked message instead of rebuilding options
+        return cls(match['key'], int(match['guild_id']), int(match['message_id']), item)
 
-        member = interaction.user
-        selected_roles = [self.assignable_roles[val] for val in self.values if val in self.assignable_roles]
+    @property
+    def values(self) -> list:
+        return self.item.values
 
-        if not selected_roles:
-            await interaction.followup.send("❌ No valid roles selected.", ephemeral=True)
-            return
+    async def callback(self, interaction: discord.Interaction):
+        start = time.perf_counter()
+        # When the guild's queue will hold this click past the reply budget, say so now rather than after the edit
+        notice = None
+        if role_mutation_queue.should_acknowledge(interaction.guild_id, REPLY_BUDGET):
+            notice = {'content': QUEUED_NOTICE}
+
+        # Fast changes are answered in a single response, slow ones are deferred first
+        path = await reply_within_budget(interaction, self.select_roles(interaction), REPLY_BUDGET, reply_stats, notice=notice)
+        menu_callback_seconds.observe(time.perf_counter() - start, path)
+
+    async def select_roles(self, interaction: discord.Interaction) -> dict:
+        """Apply the selection and return the reply to send, as send_message keyword arguments."""
+        category = role_categories.get(self.guild_id, self.key)
+        if category is None or interaction.guild is None or interaction.guild.id != self.guild_id:
+            return {'content': "❌ This menu is no longer available."}
 
-        # Separate roles to add and roles to remove (toggle behavior)
-        roles_to_remove = [role for role in selected_roles if role in member.roles]
-        roles_to_add = [role for role in selected_roles if role not in member.roles]
+        # Validate selection
+        if any(val in ["none", "loading"] for val in self.values):
+            return {'content': "❌ No valid roles available."}
 
+        index = role_index.get(interaction.guild)
         try:
-            # Remove roles the user already has
-            if roles_to_remove:
-                await member.remove_roles(*roles_to_remove)
-            # Add roles the user doesn't have
-            if roles_to_add:
-                await member.add_roles(*roles_to_add)
-
-            # Build confirmation message
-            description_parts = []
-            if roles_to_add:
-                added_names = ", ".join(r.name for r in roles_to_add)
-                description_parts.append(f"✅ Added role(s): {added_names}")
-            if roles_to_remove:
-                removed_names = ", ".join(r.name for r in roles_to_remove)
-                description_parts.append(f"❌ Removed role(s): {removed_names}")
-
-            if description_parts:
-                await interaction.followup.send(
-                    embed=BotConfirmationEmbed(description="\n".join(description_parts)),
-                    ephemeral=True
-                )
-            else:
-                await interaction.followup.send(
-                    embed=BotConfirmationEmbed(description="No changes were made to your roles."),
-                    ephemeral=True
-                )
-
+            if category.multi_select:
+                return await self.toggle_roles(interaction, index)
+            return await self.swap_role(interaction, index)
+        except QueueFull:
+            return {'content': "❌ Too many role changes queued, please try again in a minute."}
+        except discord.RateLimited:
+            return {'content': "❌ Discord is rate limiting role changes, please try again in a minute."}
         except discord.Forbidden:
-            await interaction.followup.send("❌ Missing permissions for role management.", ephemeral=True)
+            return {'content': "❌ Missing permissions for role management."}
         except discord.HTTPException:
-            await interaction.followup.send("❌ Failed to modify roles.", ephemeral=True)
-
+            return {'content': "❌ Failed to modify roles."}
+
+    async def swap_role(self, interaction: discord.Interaction, index) -> dict:
+        # Menus restored without an edit can still show a role that has since been deleted
+        selected_role = index.get(self.key, int(self.values[0]))
+        if selected_role is None:
+            return {'content': "❌ That role is no longer available."}
+
+        category_ids = [role.id for role in index.roles(self.key)]
+        edit = await member_role_serializer.submit(
+            interaction.user,
+            lambda current: plan_swap(current, category_ids, selected_role.id),
+            reason="Role menu selection"
+        )
 
-class RoleViewPings(discord.ui.View):
-    def __init__(self, guild_id, msg_id, bot=None):
-        super().__init__(timeout=None)
-        self.add_item(RoleSelectPings(guild_id=guild_id, msg_id=msg_id, bot=bot))
+        if selected_role.id in edit.added:
+            description = f"✅ **Added role:** {selected_role.name}"
+            if edit.removed:
+                removed_names = ", ".join(self.role_names(index, edit.removed))
+                description += f"\n❌ **Removed role:** {removed_names}"
+            return {'embed': BotConfirmationEmbed(description=description)}
+        return {'embed': BotConfirmationEmbed(description=f"You already have the {selected_role.name} role.")}
+
+    async def toggle_roles(self, interaction: discord.Interaction, index) -> dict:
+        selected_ids = [int(val) for val in self.values if index.get(self.key, int(val)) is not None]
+
+        if not selected_ids:
+            return {'content': "❌ No valid roles selected."}
+
+        # Roles the member has are removed, the others added, all in one edit
+        edit = await member_role_serializer.submit(
+            interaction.user,
+            lambda current: plan_toggle(current, selected_ids),
+            reason="Role menu selection"
+        )
 
-    def update_roles(self, new_roles: list):
-        self.children[0].update_roles(new_roles)
+        # Build confirmation message
+        description_parts = []
+        if edit.added:
+            added_names = ", ".join(self.role_names(index, edit.added))
+            description_parts.append(f"✅ Added role(s): {added_names}")
+        if edit.removed:
+            removed_names = ", ".join(self.role_names(index, edit.removed))
+            description_parts.append(f"❌ Removed role(s): {removed_names}")
+
+        if description_parts:
+            return {'embed': BotConfirmationEmbed(description="\n".join(description_parts))}
+        return {'embed': BotConfirmationEmbed(description="No changes were made to your roles.")}
+
+    def role_names(self, index, role_ids) -> list:
+        # Keeps the menu order instead of set order
+        return [role.name for role in index.roles(self.key) if role.id in role_ids]
+
+
+def role_menu_view(category: RoleCategory, guild_id: int, message_id: int, roles: list) -> discord.ui.View:
+    """A View holding only the menu's RoleMenuSelect, for sending or editing the message.
+
+    The view is stopped before it is returned so discord.py does not keep a
+    copy per message; clicks reach RoleMenuSelect through its custom_id.
+    """
+    view = discord.ui.View(timeout=None)
+    view.add_item(RoleMenuSelect.render(category, guild_id, message_id, roles))
+    view.stop()
+    return view
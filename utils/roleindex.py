@@ -0,0 +1,86 @@
+from typing import Callable, Dict, List
+from utils.metrics import cache_requests
+from utils.rolecategories import RoleCategory, role_categories
+
+
+class GuildRoleIndex:
+    """Roles of one guild sorted into that guild's menu categories.
+
+    Each role is run through the compiled category matchers once, when it
+    enters the index, so a lookup only walks the roles of one category.
+    Sorted results are cached until a role in that category changes.
+    """
+
+    def __init__(self, roles, categories: Dict[str, RoleCategory]) -> None:
+        self.categories = categories
+        self._members: Dict[str, Dict[int, object]] = {key: {} for key in categories}
+        self._sorted: Dict[str, List[object]] = {}
+        for role in roles:
+            self.add(role)
+
+    def add(self, role) -> None:
+        for key, category in self.categories.items():
+            if category.matches(role.name):
+                self._members[key][role.id] = role
+                self._sorted.pop(key, None)
+
+    def remove(self, role_id: int) -> None:
+        for key, members in self._members.items():
+            if members.pop(role_id, None) is not None:
+                self._sorted.pop(key, None)
+
+    def update(self, role) -> None:
+        self.remove(role.id)
+        self.add(role)
+
+    def get(self, key: str, role_id: int):
+        """The role with role_id if it currently belongs to category key, else None."""
+        return self._members.get(key, {}).get(role_id)
+
+    def roles(self, key: str) -> list:
+        ordered = self._sorted.get(key)
+        cache_requests.inc('role_index_sorted', 'miss' if ordered is None else 'hit')
+        if ordered is None:
+            # Same order as guild.roles, which discord.py keeps sorted by position
+            members = self._members.get(key, {})
+            ordered = self._sorted[key] = sorted(members.values(), key=lambda role: (role.position, role.id))
+        return ordered
+
+
+class RoleIndex:
+    """Per-guild GuildRoleIndex instances, built on first use and kept current from role events."""
+
+    def __init__(self, categories_for: Callable[[int], Dict[str, RoleCategory]]) -> None:
+        self.categories_for = categories_for
+        self._guilds: Dict[int, GuildRoleIndex] = {}
+
+    def get(self, guild) -> GuildRoleIndex:
+        index = self._guilds.get(guild.id)
+        cache_requests.inc('role_index', 'miss' if index is None else 'hit')
+        if index is None:
+            index = self._guilds[guild.id] = GuildRoleIndex(guild.roles, self.categories_for(guild.id))
+        return index
+
+    def role_created(self, role) -> None:
+        index = self._guilds.get(role.guild.id)
+        if index is not None:
+            index.add(role)
+
+    def role_updated(self, role) -> None:
+        index = self._guilds.get(role.guild.id)
+        if index is not None:
+            index.update(role)
+
+    def role_deleted(self, role) -> None:
+        index = self._guilds.get(role.guild.id)
+        if index is not None:
+            index.remove(role.id)
+
+    def forget(self, guild_id: int) -> None:
+        self._guilds.pop(guild_id, None)
+
+    def clear(self) -> None:
+        self._guilds.clear()
+
+
+role_index = RoleIndex(role_categories.for_guild)
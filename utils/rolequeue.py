@@ -0,0 +1,174 @@
+import asyncio
+import time
+from collections import deque
+from os import getenv
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+from utils.loggingsetup import getlog
+
+T = TypeVar('T')
+
+
+class QueueFull(Exception):
+    """Raised by RoleMutationQueue.run when a guild already has max_depth edits waiting."""
+
+
+class GuildQueueStats:
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.depth_max = 0
+
+    def as_dict(self) -> dict:
+        started = self.completed + self.failed
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'wait_avg': self.wait_total / started if started else 0.0,
+            'wait_max': self.wait_max,
+            'depth_max': self.depth_max,
+        }
+
+
+class RoleMutationQueue:
+    """Shared worker pool for member role edits, scheduled round-robin across guilds.
+
+    Each guild has its own FIFO and may have at most `per_guild` edits in
+    flight, since Discord rate limits member edits per guild. Workers take
+    one edit from a guild and then move on to the next guild with work, so a
+    big server posting a new menu cannot starve everyone else.
+
+    Past `max_depth` waiting edits a guild's new edits are refused with
+    QueueFull instead of piling up behind Discord's rate limit. Callers can
+    check should_acknowledge() to tell a user their click will wait longer
+    than they can be kept waiting for a reply.
+    """
+
+    def __init__(self, workers: int = 4, per_guild: int = 1, max_depth: int = 200) -> None:
+        self.workers = workers
+        self.per_guild = per_guild
+        self.max_depth = max_depth
+        # Moving average of how long one edit takes once a worker runs it, 429 retries included
+        self.edit_seconds = 0.0
+        self._queues: Dict[int, Deque[Tuple[Callable[[], Awaitable], asyncio.Future, float]]] = {}
+        self._active: Dict[int, int] = {}
+        self._tokens: Dict[int, int] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self.stats: Dict[int, GuildQueueStats] = {}
+
+    def depth(self, guild_id: int) -> int:
+        queue = self._queues.get(guild_id)
+        return len(queue) if queue else 0
+
+    def total_depth(self) -> int:
+        return sum(map(len, self._queues.values()))
+
+    def estimated_wait(self, guild_id: int) -> float:
+        """Seconds until an edit submitted now for this guild would start, from recent edit times."""
+        ahead = self.depth(guild_id) + self._active.get(guild_id, 0)
+        return ahead * self.edit_seconds / self.per_guild
+
+    def should_acknowledge(self, guild_id: int, budget: float) -> bool:
+        # A long queue of fast edits still fits in the budget and gets a single direct reply
+        return self.estimated_wait(guild_id) > budget
+
+    async def run(self, guild_id: int, job: Callable[[], Awaitable[T]]) -> T:
+        stats = self.stats.setdefault(guild_id, GuildQueueStats())
+        queue = self._queues.setdefault(guild_id, deque())
+        if len(queue) >= self.max_depth:
+            stats.rejected += 1
+            raise QueueFull(f"{len(queue)} role edits already waiting in guild {guild_id}")
+
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        queue.append((job, future, time.perf_counter()))
+        stats.submitted += 1
+        stats.depth_max = max(stats.depth_max, len(queue))
+        self._schedule(guild_id)
+        return await future
+
+    def _start(self) -> None:
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _schedule(self, guild_id: int) -> None:
+        # One token in _ready per edit a worker may start for this guild right now
+        queue = self._queues.get(guild_id)
+        while queue and self._tokens.get(guild_id, 0) < len(queue) and \
+                self._tokens.get(guild_id, 0) + self._active.get(guild_id, 0) < self.per_guild:
+            self._tokens[guild_id] = self._tokens.get(guild_id, 0) + 1
+            self._ready.put_nowait(guild_id)
+
+    async def _worker(self) -> None:
+        while True:
+            guild_id = await self._ready.get()
+            self._tokens[guild_id] -= 1
+            queue = self._queues[guild_id]
+            job, future, enqueued = queue.popleft()
+            stats = self.stats[guild_id]
+            waited = time.perf_counter() - enqueued
+            stats.wait_total += waited
+            stats.wait_max = max(stats.wait_max, waited)
+
+            self._active[guild_id] = self._active.get(guild_id, 0) + 1
+            started = time.perf_counter()
+            try:
+                if not future.done():
+                    future.set_result(await job())
+                stats.completed += 1
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                stats.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                took = time.perf_counter() - started
+                self.edit_seconds = took if not self.edit_seconds else 0.8 * self.edit_seconds + 0.2 * took
+                active = self._active.get(guild_id, 1) - 1
+                if queue or active:
+                    self._active[guild_id] = active
+                    if self._ready is not None:
+                        # Back of the line behind every other guild with work
+                        self._schedule(guild_id)
+                else:
+                    # Idle guilds leave no state behind, only their stats
+                    self._queues.pop(guild_id, None)
+                    self._active.pop(guild_id, None)
+                    self._tokens.pop(guild_id, None)
+
+    def snapshot(self) -> dict:
+        return {
+            'depth': self.total_depth(),
+            'running': sum(self._active.values()),
+            'guilds': {guild_id: {'depth': self.depth(guild_id), **stats.as_dict()} for guild_id, stats in self.stats.items()},
+        }
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._ready = None
+        for queue in self._queues.values():
+            for _, future, _ in queue:
+                future.cancel()
+            queue.clear()
+        self._queues.clear()
+        self._tokens.clear()
+        getlog().info("Role mutation queue closed.")
+
+
+role_mutation_queue = RoleMutationQueue(
+    workers=int(getenv('ROLE_QUEUE_WORKERS', '4')),
+    per_guild=int(getenv('ROLE_QUEUE_PER_GUILD', '1')),
+    max_depth=int(getenv('ROLE_QUEUE_MAX_DEPTH', '200')),
+)
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+from utils.loggingsetup import getlog
+
+
+class RoleMenuRefresher:
+    """Debounces role events into one menu refresh per guild.
+
+    The first event for a guild schedules a refresh `delay` seconds later,
+    and each further event pushes it back by `delay` again. The refresh never
+    waits more than `max_delay` seconds after the first event, so a
+    continuous stream of edits still gets applied. An admin creating ten
+    roles in a row therefore costs one refresh.
+    """
+
+    def __init__(self, refresh: Callable[[int], Awaitable[None]], delay: float = 5.0, max_delay: float = 30.0) -> None:
+        self.refresh = refresh
+        self.delay = delay
+        self.max_delay = max_delay
+        self._first_event: Dict[int, float] = {}
+        self._last_event: Dict[int, float] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def mark(self, guild_id: int) -> None:
+        now = asyncio.get_running_loop().time()
+        self._first_event.setdefault(guild_id, now)
+        self._last_event[guild_id] = now
+        if guild_id not in self._tasks:
+            self._tasks[guild_id] = asyncio.create_task(self._refresh_later(guild_id))
+
+    async def _refresh_later(self, guild_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                deadline = min(self._last_event[guild_id] + self.delay, self._first_event[guild_id] + self.max_delay)
+                if loop.time() >= deadline:
+                    break
+                await asyncio.sleep(deadline - loop.time())
+        finally:
+            # Events arriving while the refresh runs start a new debounce window
+            self._first_event.pop(guild_id, None)
+            self._last_event.pop(guild_id, None)
+            self._tasks.pop(guild_id, None)
+        try:
+            await self.refresh(guild_id)
+        except Exception as e:
+            getlog().error(f"Role menu refresh for guild {guild_id} failed: {e}")
+
+    def cancel(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._first_event.clear()
+        self._last_event.clear()
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from os import getenv
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+import discord
+# Looked up through the module at call time, so a /reload of rolediff reaches the serializer without replacing it
+from utils import rolediff
+from utils.rolequeue import RoleMutationQueue, role_mutation_queue
+
+# Turns the role IDs a member has (as of the previous selection) into the edit one click wants
+RolePlan = Callable[[FrozenSet[int]], rolediff.RoleEdit]
+
+
+class MemberRoleSerializer:
+    """Runs role menu edits for one (guild, member) one at a time.
+
+    Clicks that arrive while an edit for the same member is in flight are
+    queued, then planned in order on top of each other and sent as a single
+    edit carrying only the final state. Each click still gets back the
+    RoleEdit for its own step, so its reply describes what that click did.
+
+    Planning starts from the member as Discord returned it after the last
+    edit rather than member.roles, which lags until the gateway sends the
+    member update. The merged edit is applied as a diff on top of that
+    member's roles, and when they are older than `max_age` seconds by the
+    time the guild queue reaches the edit (a busy guild), the member is
+    fetched again first, so role changes made elsewhere in the meantime are
+    not reverted.
+    """
+
+    def __init__(self, queue: Optional[RoleMutationQueue] = None, max_age: float = 1.0) -> None:
+        # Edits go through the per-guild queue when one is given, otherwise straight to the API
+        self.queue = queue
+        self.max_age = max_age
+        self.refetched = 0
+        self._pending: Dict[Tuple[int, int], List[Tuple[RolePlan, asyncio.Future]]] = {}
+        self._workers: Dict[Tuple[int, int], asyncio.Task] = {}
+        self.submitted = 0
+        self.applied = 0
+
+    async def submit(self, member: discord.Member, plan: RolePlan, reason: Optional[str] = None) -> rolediff.RoleEdit:
+        key = (member.guild.id, member.id)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(key, []).append((plan, future))
+        self.submitted += 1
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._run(key, member, reason))
+        return await future
+
+    async def _run(self, key: Tuple[int, int], member: discord.Member, reason: Optional[str]) -> None:
+        # The freshest copy of the member: the click that started this run, then each edit's response
+        latest, seen = member, time.monotonic()
+        current = rolediff.member_role_ids(member)
+        steps: List[Tuple[rolediff.RoleEdit, asyncio.Future]] = []
+
+        async def apply(merged: rolediff.RoleEdit) -> None:
+            nonlocal latest, seen
+            if time.monotonic() - seen > self.max_age:
+                latest = await member.guild.fetch_member(member.id)
+                self.refetched += 1
+            updated = await rolediff.apply_role_edit(latest, merged, reason=reason)
+            if updated is not None:
+                latest = updated
+            seen = time.monotonic()
+
+        try:
+            while self._pending.get(key):
+                batch = self._pending.pop(key)
+                steps = []
+                state = current
+                for plan, future in batch:
+                    try:
+                        edit = plan(state)
+                    except Exception as e:
+                        future.set_exception(e)
+                        continue
+                    steps.append((edit, future))
+                    state = edit.desired
+
+                merged = rolediff.RoleEdit(current, state)
+                try:
+                    if merged.changed:
+                        if self.queue is not None:
+                            await self.queue.run(member.guild.id, lambda: apply(merged))
+                        else:
+                            await apply(merged)
+                        self.applied += 1
+                except Exception as e:
+                    for _, future in steps:
+                        if not future.done():
+                            future.set_exception(e)
+                    # The edit may or may not have landed, so the next batch is planned on a refetched member
+                    seen = float('-inf')
+                    current = rolediff.member_role_ids(latest)
+                    continue
+
+                # Includes roles changed elsewhere, which the next batch plans on top of
+                current = rolediff.member_role_ids(latest)
+                for edit, future in steps:
+                    if not future.done():
+                        future.set_result(edit)
+                steps = []
+        finally:
+            # Only reached with work left over when the task is cancelled
+            for _, future in steps + self._pending.pop(key, []):
+                if not future.done():
+                    future.cancel()
+            self._workers.pop(key, None)
+
+    def pending(self) -> int:
+        return sum(map(len, self._pending.values()))
+
+
+# Never re-imported by /reload: a second instance would run its own worker for a member next to the old one
+member_role_serializer = MemberRoleSerializer(role_mutation_queue, max_age=float(getenv('ROLE_EDIT_MAX_AGE', '1.0')))
@@ -0,0 +1,52 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+from db.persistent_db import get_state, set_state
+from utils.loggingsetup import getlog
+
+REPORT_KEY = 'startup_report'
+
+
+class StartupTimeline:
+    """Start and duration of each startup phase, in seconds since `origin` (the top of run_bot.py).
+
+    Phases may overlap, e.g. cogs that load in parallel. save() stores the
+    report in bot_state and logs how the total compares with the previous start.
+    """
+
+    def __init__(self, origin: Optional[float] = None) -> None:
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases: List[dict] = []
+
+    def record(self, name: str, start: float, end: Optional[float] = None) -> None:
+        end = time.perf_counter() if end is None else end
+        self.phases.append({'phase': name, 'start': start - self.origin, 'seconds': end - start})
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def as_dict(self) -> dict:
+        return {
+            'total': max((phase['start'] + phase['seconds'] for phase in self.phases), default=0.0),
+            'phases': self.phases,
+        }
+
+    async def save(self) -> dict:
+        report = self.as_dict()
+        for phase in self.phases:
+            getlog().info(f"Startup {phase['phase']:<24} +{phase['start']:7.3f}s  {phase['seconds']:7.3f}s")
+
+        previous = await get_state(REPORT_KEY)
+        if previous:
+            previous_total = json.loads(previous)['total']
+            getlog().info(f"Startup took {report['total']:.3f}s (previous start {previous_total:.3f}s, {report['total'] - previous_total:+.3f}s).")
+        else:
+            getlog().info(f"Startup took {report['total']:.3f}s.")
+        await set_state(REPORT_KEY, json.dumps(report))
+        return report